@@ -1,11 +1,26 @@
 import streamlit as st
+from streamlit import runtime
 import pandas as pd
-import folium
-from streamlit_folium import folium_static
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
+import streamlit.components.v1 as components
 import numpy as np
+import logging
+import os
+import re
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+import charging_analytics as analytics
+from charging_analytics import (
+    CANDIDATE_SORT_OPTIONS, CAPACITY_LIMITS, apply_capacity, capacity_values, get_dataset_version,
+    lookup_station_timeline, parse_candidate_sites, query_station_filter_index, query_station_search_index,
+    query_utilization_cube, query_utilization_totals, rank_candidate_sites, select_utilization_rows,
+    summarize_utilization_rows, sweep_capacity_grid
+)
+
+logger = logging.getLogger(__name__)
 
 # 頁面設定
 st.set_page_config(
@@ -116,7 +131,7 @@ THEMES = {
     }
 }
 
-def get_theme_css(theme):
+def build_theme_css(theme):
     """根據選擇的主題生成對應的 CSS，支援深色模式"""
     colors = THEMES[theme]
     
@@ -514,6 +529,17 @@ def get_theme_css(theme):
 </style>
 """
 
+# Streamlit 對 10 KB 以上且內容不變的元素只送出雜湊參照，主題 CSS 保持為單一、逐字相同的區塊，
+# 瀏覽器只在首次載入與切換主題時收到完整樣式；壓縮後會低於門檻而變成每次重跑都重送，故不壓縮
+@st.cache_resource
+def load_theme_css():
+    """各主題的 CSS 在程序中只產生一次，跨重跑與 session 共用"""
+    return {theme: build_theme_css(theme) for theme in THEMES}
+
+def get_theme_css(theme):
+    """取得預先產生的主題 CSS"""
+    return load_theme_css()[theme]
+
 # ==================== 登入驗證功能 ====================
 def check_login():
     """檢查登入狀態"""
@@ -521,9 +547,20 @@ def check_login():
         st.session_state.logged_in = False
     return st.session_state.logged_in
 
-def login_page():
-    """登入頁面 - 適配深色模式"""
-    st.markdown(f"""
+def minify_style_blocks(html):
+    """移除 <style> 區塊內的註解與多餘空白；<script> 只去除行首縮排，保留換行以免 // 註解吃掉後續程式碼"""
+    def minify(match):
+        css = re.sub(r'/\*.*?\*/', '', match.group(1), flags=re.S)
+        css = re.sub(r'\s+', ' ', css)
+        css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+        return f"<style>{css.strip()}</style>"
+    html = re.sub(r'<style>(.*?)</style>', minify, html, flags=re.S)
+    return re.sub(r'\n\s+', '\n', html).strip()
+
+@st.cache_resource
+def load_login_page_css():
+    """登入頁樣式只產生一次；登入頁每次重跑都會完整重送此區塊，因此先壓縮"""
+    return minify_style_blocks(f"""
     {get_dark_mode_detection_css()}
     <style>
         .stApp {{
@@ -640,7 +677,11 @@ def login_page():
             color: #E0E0E0 !important;
         }}
     </style>
-    """, unsafe_allow_html=True)
+    """)
+
+def login_page():
+    """登入頁面 - 適配深色模式"""
+    st.markdown(load_login_page_css(), unsafe_allow_html=True)
     
     col1, col2, col3 = st.columns([1, 2, 1])
     
@@ -665,6 +706,7 @@ def login_page():
         if login_button:
             if username == "EVALUE" and password == "EVALUE2025":
                 st.session_state.logged_in = True
+                st.session_state.username = username
                 st.success("✅ 登入成功！")
                 st.rerun()
             else:
@@ -673,214 +715,327 @@ def login_page():
 def logout():
     """登出功能"""
     st.session_state.logged_in = False
+    st.session_state.pop('username', None)
     st.rerun()
 
-# ==================== 主程式 ====================
+# ==================== 重跑效能量測 ====================
+# 僅管理者帳號可開啟：設定環境變數 EVALUE_PROFILING=1，或在網址加上 ?profile=1
+ADMIN_USERS = {"EVALUE"}
+PROFILING_ENV_VAR = "EVALUE_PROFILING"
+PROFILE_HISTORY_SIZE = 20
+# 未在本執行緒計算、但耗時超過此值的呼叫不算命中：多半是在等其他執行緒（例如背景預熱）計算同一個快取鍵
+PROFILE_WAIT_THRESHOLD_MS = 20
+# 每次重跑以 INFO 等級輸出一行 JSON，可交由日誌收集系統彙整；
+# 預設寫到 stderr，設定 EVALUE_PROFILING_LOG 則改為附加到該檔案
+PROFILING_LOG_ENV_VAR = "EVALUE_PROFILING_LOG"
+profile_logger = logging.getLogger("charging_profile")
 
-if not check_login():
-    login_page()
-    st.stop()
+# 每個 session 的重跑在各自的執行緒中進行，量測紀錄放在執行緒區域變數，背景執行緒呼叫快取函式時不受影響
+_profile_state = threading.local()
 
-# 初始化主題
-if 'current_theme' not in st.session_state:
-    st.session_state.current_theme = "商務灰"
+def is_profiling_enabled():
+    """目前使用者為管理者且已開啟量測時回傳 True"""
+    if st.session_state.get('username') not in ADMIN_USERS:
+        return False
+    return os.environ.get(PROFILING_ENV_VAR) == "1" or st.query_params.get("profile") == "1"
 
-# 自定義 CSS - 根據選擇的主題
-st.markdown(get_theme_css(st.session_state.current_theme), unsafe_allow_html=True)
+def configure_profile_logger():
+    """開啟量測時為 charging_profile logger 掛上只輸出訊息本身的 handler；部署環境已自行設定 handler 時不更動"""
+    if profile_logger.handlers:
+        return
+    
+    log_path = os.environ.get(PROFILING_LOG_ENV_VAR)
+    handler = logging.FileHandler(log_path, encoding='utf-8') if log_path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    profile_logger.addHandler(handler)
+    profile_logger.setLevel(logging.INFO)
+    # 不往上層傳遞，避免與 root logger 的設定重複輸出
+    profile_logger.propagate = False
 
-# 載入資料函數
-@st.cache_data
-def load_station_data():
-    try:
-        for encoding in ['utf-8', 'utf-8-sig', 'big5', 'gbk', 'cp950']:
-            try:
-                df = pd.read_csv('data/stations.csv', encoding=encoding)
-                break
-            except (FileNotFoundError, UnicodeDecodeError):
-                continue
-        else:
-            st.error("❌ 找不到充電站資料檔案")
-            return pd.DataFrame()
-        
-        column_mapping = {
-            '站ID': 'station_id', '名稱': 'name', '經度': 'longitude', '緯度': 'latitude',
-            '充電槍數': 'charger_count', '啟用日期': 'installation_date', '負責人': 'manager',
-            '站點規格': 'station_type', 'AC槍數量': 'ac_count', 'DC槍數量': 'dc_count',
-            '槍頭規格': 'connector_type', '區域屬性': 'area_type', '站點屬性': 'location_type',
-            '縣市': 'city', '標案性質': 'project_type'
+def start_rerun_profile():
+    """開始記錄本次重跑；未開啟量測時回傳 None，各量測點不做任何事"""
+    record = None
+    if is_profiling_enabled():
+        configure_profile_logger()
+        record = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'user': st.session_state.get('username'),
+            'started': time.perf_counter(),
+            'stages': [],
+            'cache': [],
+            'computed': {}
         }
-        
-        df = df.rename(columns=column_mapping)
-        required_columns = ['station_id', 'name', 'latitude', 'longitude', 'charger_count']
-        if not all(col in df.columns for col in required_columns):
-            return pd.DataFrame()
-        
-        if 'address' not in df.columns:
-            if 'area_type' in df.columns and 'location_type' in df.columns:
-                df['address'] = df['area_type'].fillna('').astype(str) + ' - ' + df['location_type'].fillna('').astype(str)
-            else:
-                df['address'] = df['name']
-        
-        df = df.dropna(subset=['latitude', 'longitude'])
-        df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
-        df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
-        df = df.dropna(subset=['latitude', 'longitude'])
-        
-        for col in ['charger_count', 'ac_count', 'dc_count']:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        return df
-    except Exception as e:
-        st.error(f"❌ 讀取資料時發生錯誤: {str(e)}")
-        return pd.DataFrame()
+    _profile_state.record = record
+    return record
 
-@st.cache_data
-def load_usage_data():
+@contextmanager
+def profile_stage(name):
+    """量測一個重跑階段的耗時"""
+    record = getattr(_profile_state, 'record', None)
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
     try:
-        for encoding in ['utf-8', 'utf-8-sig', 'big5', 'gbk', 'cp950']:
-            try:
-                df = pd.read_csv('data/usedata.csv', encoding=encoding)
-                break
-            except (FileNotFoundError, UnicodeDecodeError):
-                continue
-        else:
-            return pd.DataFrame()
-        df['Avg_Degree_Per_Day'] = pd.to_numeric(df['Avg_Degree_Per_Day'], errors='coerce')
-        return df
-    except:
-        return pd.DataFrame()
+        yield
+    finally:
+        record['stages'].append({'stage': name, 'ms': round((time.perf_counter() - start) * 1000, 2)})
 
-@st.cache_data
-def calculate_utilization_rate(_stations_df, _usage_df, ac_capacity=7, dc_capacity=30):
-    if _usage_df.empty or _stations_df.empty:
-        return pd.DataFrame()
-    
-    merged = _usage_df.merge(
-        _stations_df[['station_id', 'ac_count', 'dc_count', 'installation_date']], 
-        left_on='Station', right_on='station_id', how='left'
-    )
-    
-    if 'installation_date' in merged.columns:
-        merged['installation_date'] = pd.to_datetime(
-            merged['installation_date'], format='mixed', dayfirst=False, errors='coerce'
-        )
-    
-    def calc_rate(row):
-        if pd.isna(row['Avg_Degree_Per_Day']):
-            return None
-        
-        try:
-            year = int(row['Quarter'].split('-')[0])
-            quarter_num = int(row['Quarter'].split('-Q')[1])
-            quarter_start_month = (quarter_num - 1) * 3 + 1
-            quarter_start = pd.Timestamp(year=year, month=quarter_start_month, day=1)
-            
-            if quarter_num == 4:
-                quarter_end = pd.Timestamp(year=year, month=12, day=31)
+def profiled_cache(cache_decorator):
+    """套用 st.cache_data / st.cache_resource 並記錄每次呼叫的耗時與快取狀態；
+    本體在本執行緒執行為 miss，未執行且耗時不超過 PROFILE_WAIT_THRESHOLD_MS 為 hit，否則為 wait"""
+    def decorate(func):
+        name = func.__name__
+        
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            record = getattr(_profile_state, 'record', None)
+            if record is not None:
+                record['computed'][name] = record['computed'].get(name, 0) + 1
+            return func(*args, **kwargs)
+        
+        cached = cache_decorator(compute)
+        
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            record = getattr(_profile_state, 'record', None)
+            if record is None:
+                return cached(*args, **kwargs)
+            computed_before = record['computed'].get(name, 0)
+            start = time.perf_counter()
+            result = cached(*args, **kwargs)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if record['computed'].get(name, 0) != computed_before:
+                status = 'miss'
+            elif elapsed_ms > PROFILE_WAIT_THRESHOLD_MS:
+                status = 'wait'
             else:
-                next_quarter_start = pd.Timestamp(year=year, month=quarter_start_month + 3, day=1)
-                quarter_end = next_quarter_start - pd.Timedelta(days=1)
-            
-            quarter_days = (quarter_end - quarter_start).days + 1
-            actual_days = quarter_days
-            
-            if pd.notna(row.get('installation_date')):
-                install_date = pd.Timestamp(row['installation_date'])
-                if quarter_start <= install_date <= quarter_end:
-                    actual_days = (quarter_end - install_date).days + 1
-        except:
-            quarter_days = 91
-            actual_days = 91
-        
-        adjusted_avg = (row['Avg_Degree_Per_Day'] * quarter_days) / actual_days
-        
-        if row['ChargerType'] == 'AC':
-            return adjusted_avg / (row['ac_count'] * ac_capacity) if row['ac_count'] > 0 else None
-        elif row['ChargerType'] == 'DC':
-            return adjusted_avg / (row['dc_count'] * dc_capacity) if row['dc_count'] > 0 else None
-        return None
-    
-    merged['utilization_rate'] = merged.apply(calc_rate, axis=1)
-    return merged
+                status = 'hit'
+            record['cache'].append({
+                'function': name,
+                'status': status,
+                'hit': status == 'hit',
+                'ms': round(elapsed_ms, 2)
+            })
+            return result
+        
+        call.clear = cached.clear
+        return call
+    return decorate
 
-@st.cache_data
-def calculate_quarterly_utilization(_utilization_df, station_ids, ac_capacity, dc_capacity):
-    """計算季度稼動率，加入參數作為快取鍵"""
-    if _utilization_df.empty or not station_ids:
-        return pd.DataFrame()
-    
-    filtered = _utilization_df[_utilization_df['Station'].isin(station_ids)].copy()
-    if filtered.empty:
-        return pd.DataFrame()
-    
-    quarterly = filtered.groupby(['Quarter', 'ChargerType'])['utilization_rate'].mean().reset_index()
-    quarterly = quarterly.sort_values('Quarter')
-    pivot_table = quarterly.pivot(index='Quarter', columns='ChargerType', values='utilization_rate').reset_index()
-    pivot_table.columns.name = None
-    
-    pivot_table['Year'] = pivot_table['Quarter'].str[:4]
-    
-    agg_dict = {}
-    if 'AC' in pivot_table.columns:
-        agg_dict['AC'] = 'mean'
-    if 'DC' in pivot_table.columns:
-        agg_dict['DC'] = 'mean'
-    
-    if agg_dict:
-        yearly_avg = pivot_table.groupby('Year').agg(agg_dict).reset_index()
-        
-        if 'AC' in yearly_avg.columns:
-            yearly_avg['AC年成長率'] = yearly_avg['AC'].pct_change() * 100
-        if 'DC' in yearly_avg.columns:
-            yearly_avg['DC年成長率'] = yearly_avg['DC'].pct_change() * 100
-        
-        merge_cols = ['Year']
-        if 'AC年成長率' in yearly_avg.columns:
-            merge_cols.append('AC年成長率')
-        if 'DC年成長率' in yearly_avg.columns:
-            merge_cols.append('DC年成長率')
-        
-        pivot_table = pivot_table.merge(
-            yearly_avg[merge_cols],
-            on='Year',
-            how='left'
-        )
+def finish_rerun_profile(record):
+    """結束本次重跑的量測：輸出一行 JSON 結構化紀錄，並保留最近幾次重跑供管理者面板顯示"""
+    _profile_state.record = None
+    if record is None:
+        return
     
-    pivot_table = pivot_table.drop('Year', axis=1)
+    record['total_ms'] = round((time.perf_counter() - record.pop('started')) * 1000, 2)
+    record.pop('computed')
+    record['tab'] = st.session_state.get('current_tab')
+    profile_logger.info(json.dumps(record, ensure_ascii=False))
     
-    if 'AC' in pivot_table.columns:
-        pivot_table['AC'] = pivot_table['AC'].round(2)
+    history = st.session_state.setdefault('profile_history', [])
+    history.append(record)
+    del history[:-PROFILE_HISTORY_SIZE]
+
+def render_profile_panel(record):
+    """管理者效能面板：本次重跑各階段耗時、快取命中情形與最近重跑紀錄下載"""
+    if record is None:
+        return
     
-    if 'DC' in pivot_table.columns:
-        pivot_table['DC'] = pivot_table['DC'].round(2)
+    with st.expander(f"🛠️ 效能量測（管理者）：本次重跑 {record['total_ms']:.0f} ms", expanded=False):
+        stage_col, cache_col = st.columns(2)
+        with stage_col:
+            st.markdown("**各階段耗時**")
+            if record['stages']:
+                st.dataframe(pd.DataFrame(record['stages']), use_container_width=True, hide_index=True)
+            else:
+                st.caption("本次重跑未執行任何量測階段")
+        with cache_col:
+            st.markdown("**快取函式呼叫**")
+            if record['cache']:
+                cache_df = pd.DataFrame(record['cache'])
+                hit_count = int(cache_df['hit'].sum())
+                wait_count = int((cache_df['status'] == 'wait').sum())
+                wait_text = f"，等待其他執行緒計算 {wait_count} 次" if wait_count else ""
+                st.caption(f"命中 {hit_count} / {len(cache_df)} 次{wait_text}")
+                st.dataframe(cache_df, use_container_width=True, hide_index=True)
+            else:
+                st.caption("本次重跑未呼叫快取函式")
+        
+        history = st.session_state.get('profile_history', [])
+        st.download_button(
+            label=f"📥 下載最近 {len(history)} 次重跑紀錄 (JSON Lines)",
+            data='\n'.join(json.dumps(item, ensure_ascii=False) for item in history),
+            file_name="rerun_profile.jsonl",
+            mime="application/x-ndjson",
+            key="profile_download"
+        )
+
+# ==================== 快取與資料存取 ====================
+# 快取設定：分析核心（charging_analytics）不依賴 Streamlit，快取與跨 session 共用在此層處理
+CACHE_TTL_SECONDS = 6 * 60 * 60
+CACHE_MAX_ENTRIES = 64
+
+@profiled_cache(st.cache_resource(ttl=CACHE_TTL_SECONDS, max_entries=2))
+def load_utilization_base(_stations_df, _usage_df, data_version=None, incremental=False):
+    """計算與容量參數無關的每槍每日攤提度數，同一資料版本只計算一次並跨 session 共用（唯讀）"""
+    usage_version = data_version[1] if data_version else None
+    return analytics.compute_utilization_base(_stations_df, _usage_df, usage_version, incremental)
+
+@profiled_cache(st.cache_resource(ttl=CACHE_TTL_SECONDS, max_entries=2))
+def load_utilization_station_index(_utilization_base, data_version=None):
+    """建立稼動率明細的站點列位置索引，隨資料版本一次建立並跨次重跑共用"""
+    return analytics.build_utilization_station_index(_utilization_base)
+
+@profiled_cache(st.cache_resource(ttl=CACHE_TTL_SECONDS, max_entries=2))
+def load_station_timeline_store(_utilization_base, data_version=None):
+    """預先彙總每站歷季度數，單站歷史查詢直接以站點 ID 切片，隨資料版本一次建立並跨次重跑共用"""
+    return analytics.build_station_timeline_store(_utilization_base)
+
+@profiled_cache(st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES))
+def calculate_quarterly_utilization(_utilization_base, _station_index, station_ids, ac_capacity, dc_capacity, data_version=None):
+    """計算季度稼動率，加入參數與資料版本作為快取鍵"""
+    return analytics.calculate_quarterly_utilization(_utilization_base, _station_index, station_ids, ac_capacity, dc_capacity)
+
+@profiled_cache(st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES))
+def build_utilization_cube(_stations_df, _utilization_df, data_version=None):
+    """依站點類別屬性、季度與槍型預先彙總每槍每日度數，每個資料版本只彙總一次"""
+    return analytics.build_utilization_cube(_stations_df, _utilization_df)
+
+@profiled_cache(st.cache_resource(ttl=CACHE_TTL_SECONDS, max_entries=2))
+def load_station_filter_index(_stations_df, data_version=None):
+    """建立站點類別篩選索引，隨站點資料一次建立並跨次重跑共用"""
+    return analytics.build_station_filter_index(_stations_df)
+
+@profiled_cache(st.cache_resource(ttl=CACHE_TTL_SECONDS, max_entries=2))
+def load_station_search_index(_stations_df, data_version=None):
+    """建立站名搜尋索引，隨站點資料一次建立並跨次重跑共用"""
+    return analytics.build_station_search_index(_stations_df)
+
+@profiled_cache(st.cache_resource(ttl=CACHE_TTL_SECONDS, max_entries=2))
+def load_station_index(_stations_df, data_version=None):
+    """建立站點空間索引，隨站點資料一次建立並跨次重跑共用"""
+    return analytics.build_station_grid_index(_stations_df)
+
+@profiled_cache(st.cache_resource(ttl=CACHE_TTL_SECONDS, max_entries=2))
+def load_data_store(data_version):
+    """整個程序共用的唯讀資料倉：站點、稼動率明細（已含使用資料各欄）與各索引每個資料版本只保存一份；
+    各 session 只在 session_state 保留搜尋條件等小型鍵值，不可修改此處的 DataFrame"""
+    station_version, usage_version = data_version
+    stations_df = analytics.load_station_data()
+    usage_df = analytics.load_usage_data()
     
-    return pivot_table
+    utilization_df = pd.DataFrame()
+    if not usage_df.empty:
+        utilization_df = load_utilization_base(stations_df, usage_df, data_version, incremental=True)
+    
+    return {
+        'version': data_version,
+        'stations': stations_df,
+        'utilization': utilization_df,
+        'station_index': load_station_index(stations_df, station_version),
+        'filter_index': load_station_filter_index(stations_df, station_version),
+        'search_index': load_station_search_index(stations_df, station_version),
+        'utilization_index': load_utilization_station_index(utilization_df, data_version),
+        'station_timelines': load_station_timeline_store(utilization_df, data_version)
+    }
+
+@profiled_cache(st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES))
+def find_nearby_stations(target_lat, target_lon, _stations_df, radius_km=5, _station_index=None, data_version=None,
+                         filters=None, _filter_index=None):
+    """查詢半徑內站點，以座標、半徑、篩選條件與資料版本作為快取鍵"""
+    return analytics.find_nearby_stations(
+        target_lat, target_lon, _stations_df, radius_km, _station_index,
+        filters=filters, filter_index=_filter_index
+    )
+
+@profiled_cache(st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES))
+def evaluate_candidate_sites(candidates, _stations_df, _utilization_base, radius_km, ac_capacity, dc_capacity,
+                             filters=None, _station_index=None, _filter_index=None, data_version=None):
+    """批次評估多個候選點，以候選點內容、參數與資料版本作為快取鍵"""
+    return analytics.evaluate_candidate_sites(
+        candidates, _stations_df, _utilization_base, radius_km, ac_capacity, dc_capacity,
+        filters=filters, station_index=_station_index, filter_index=_filter_index
+    )
+
+
+# 站點數超過此門檻時改用叢集並於瀏覽器端產生 popup
+MARKER_CLUSTER_THRESHOLD = 100
 
-@st.cache_data
-def find_nearby_stations(target_lat, target_lon, _stations_df, radius_km=5):
-    if _stations_df.empty:
-        return pd.DataFrame()
-    
-    from numpy import radians, cos, sin, arcsin, sqrt
-    
-    lat1 = radians(target_lat)
-    lon1 = radians(target_lon)
-    lat2 = radians(_stations_df['latitude'].values)
-    lon2 = radians(_stations_df['longitude'].values)
-    
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * arcsin(sqrt(a))
-    distances = 6371 * c
-    
-    result = _stations_df.copy()
-    result['distance_km'] = distances
-    nearby = result[result['distance_km'] <= radius_km].sort_values('distance_km')
-    return nearby
+STATION_MARKER_CALLBACK = """
+var callback = function (row) {
+    function esc(value) {
+        return String(value).replace(/[&<>"']/g, function (c) {
+            return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+        });
+    }
+    var parts = ['<b>' + esc(row[2]) + '</b>', '站點ID: ' + esc(row[3])];
+    if (row[4] !== null) {
+        parts.push('AC槍數: ' + row[4]);
+        parts.push('DC槍數: ' + row[5]);
+    } else {
+        parts.push('充電槍數: ' + row[6]);
+    }
+    parts.push('距離: ' + row[7].toFixed(2) + ' km');
+    var labels = ['區域', '類型', '縣市', '標案性質'];
+    for (var i = 0; i < labels.length; i++) {
+        if (row[8 + i] !== null) {
+            parts.push(labels[i] + ': ' + esc(row[8 + i]));
+        }
+    }
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {
+        icon: L.AwesomeMarkers.icon({icon: 'charging-station', prefix: 'fa', markerColor: 'blue'})
+    });
+    marker.bindPopup("<div style='width:200px'>" + parts.join('<br>') + '</div>', {maxWidth: 220});
+    marker.bindTooltip(esc(row[2]));
+    return marker;
+};
+"""
+
+def build_marker_rows(nearby_stations):
+    """將站點整理成精簡的陣列資料，供瀏覽器端 callback 產生 marker 與 popup"""
+    n = len(nearby_stations)
+    
+    def column_or_none(col):
+        if col not in nearby_stations.columns:
+            return [None] * n
+        values = nearby_stations[col].astype(object)
+        return values.where(values.notna(), None).tolist()
+    
+    if 'ac_count' in nearby_stations.columns and 'dc_count' in nearby_stations.columns:
+        ac_counts = nearby_stations['ac_count'].fillna(0).astype(int).tolist()
+        dc_counts = nearby_stations['dc_count'].fillna(0).astype(int).tolist()
+        charger_counts = [None] * n
+    else:
+        ac_counts = [None] * n
+        dc_counts = [None] * n
+        charger_counts = nearby_stations['charger_count'].astype(int).tolist()
+    
+    return [list(row) for row in zip(
+        nearby_stations['latitude'].astype(float).tolist(),
+        nearby_stations['longitude'].astype(float).tolist(),
+        nearby_stations['name'].astype(str).tolist(),
+        nearby_stations['station_id'].astype(str).tolist(),
+        ac_counts,
+        dc_counts,
+        charger_counts,
+        nearby_stations['distance_km'].round(4).tolist(),
+        column_or_none('area_type'),
+        column_or_none('location_type'),
+        column_or_none('city'),
+        column_or_none('project_type')
+    )]
 
-def create_map(center_lat, center_lon, _nearby_stations, target_address, radius_km):
+def create_map(center_lat, center_lon, _nearby_stations, target_address, radius_km, fast_markers=None):
+    """建立地圖；fast_markers 為 None 時依站點數自動決定是否改用叢集模式"""
+    # folium 只有拓點評估的地圖需要，延後到第一次建立地圖時才匯入，登入頁與平均稼動率分頁不必載入
+    import folium
+    from folium.plugins import FastMarkerCluster
+    
+    if fast_markers is None:
+        fast_markers = len(_nearby_stations) > MARKER_CLUSTER_THRESHOLD
+    
     m = folium.Map(location=[center_lat, center_lon], zoom_start=13, tiles='OpenStreetMap')
     
     folium.Marker(
@@ -890,36 +1045,39 @@ def create_map(center_lat, center_lon, _nearby_stations, target_address, radius_
         icon=folium.Icon(color='red', icon='star')
     ).add_to(m)
     
-    for idx, station in _nearby_stations.iterrows():
-        popup_parts = [f"<b>{station['name']}</b>", f"站點ID: {station['station_id']}"]
-        
-        if 'ac_count' in station and 'dc_count' in station:
-            ac_num = int(station['ac_count']) if pd.notna(station['ac_count']) else 0
-            dc_num = int(station['dc_count']) if pd.notna(station['dc_count']) else 0
-            popup_parts.append(f"AC槍數: {ac_num}")
-            popup_parts.append(f"DC槍數: {dc_num}")
-        else:
-            popup_parts.append(f"充電槍數: {int(station['charger_count'])}")
-        
-        popup_parts.append(f"距離: {station['distance_km']:.2f} km")
-        
-        if 'area_type' in station and pd.notna(station['area_type']):
-            popup_parts.append(f"區域: {station['area_type']}")
-        if 'location_type' in station and pd.notna(station['location_type']):
-            popup_parts.append(f"類型: {station['location_type']}")
-        if 'city' in station and pd.notna(station['city']):
-            popup_parts.append(f"縣市: {station['city']}")
-        if 'project_type' in station and pd.notna(station['project_type']):
-            popup_parts.append(f"標案性質: {station['project_type']}")
-        
-        popup_html = f"<div style='width:200px'>{'<br>'.join(popup_parts)}</div>"
-        
-        folium.Marker(
-            [station['latitude'], station['longitude']],
-            popup=folium.Popup(popup_html, max_width=220),
-            tooltip=station['name'],
-            icon=folium.Icon(color='blue', icon='charging-station', prefix='fa')
-        ).add_to(m)
+    if fast_markers:
+        FastMarkerCluster(build_marker_rows(_nearby_stations), callback=STATION_MARKER_CALLBACK).add_to(m)
+    else:
+        for idx, station in _nearby_stations.iterrows():
+            popup_parts = [f"<b>{station['name']}</b>", f"站點ID: {station['station_id']}"]
+            
+            if 'ac_count' in station and 'dc_count' in station:
+                ac_num = int(station['ac_count']) if pd.notna(station['ac_count']) else 0
+                dc_num = int(station['dc_count']) if pd.notna(station['dc_count']) else 0
+                popup_parts.append(f"AC槍數: {ac_num}")
+                popup_parts.append(f"DC槍數: {dc_num}")
+            else:
+                popup_parts.append(f"充電槍數: {int(station['charger_count'])}")
+            
+            popup_parts.append(f"距離: {station['distance_km']:.2f} km")
+            
+            if 'area_type' in station and pd.notna(station['area_type']):
+                popup_parts.append(f"區域: {station['area_type']}")
+            if 'location_type' in station and pd.notna(station['location_type']):
+                popup_parts.append(f"類型: {station['location_type']}")
+            if 'city' in station and pd.notna(station['city']):
+                popup_parts.append(f"縣市: {station['city']}")
+            if 'project_type' in station and pd.notna(station['project_type']):
+                popup_parts.append(f"標案性質: {station['project_type']}")
+            
+            popup_html = f"<div style='width:200px'>{'<br>'.join(popup_parts)}</div>"
+            
+            folium.Marker(
+                [station['latitude'], station['longitude']],
+                popup=folium.Popup(popup_html, max_width=220),
+                tooltip=station['name'],
+                icon=folium.Icon(color='blue', icon='charging-station', prefix='fa')
+            ).add_to(m)
     
     folium.Circle(
         radius=radius_km * 1000, location=[center_lat, center_lon],
@@ -928,6 +1086,63 @@ def create_map(center_lat, center_lon, _nearby_stations, target_address, radius_
     
     return m
 
+QUARTERLY_TH_STYLE = 'padding: 12px; border: 1px solid #E0E0E0;'
+QUARTERLY_TD_STYLE = 'padding: 10px; border: 1px solid #E0E0E0; color: #333333;'
+QUARTERLY_GROWTH_TD_STYLE = 'padding: 10px; border: 1px solid #E0E0E0; background-color: #F5F5F5; color: {color}; font-weight: bold; vertical-align: middle;'
+
+def format_growth_cells(growth, is_first, rowspan):
+    """年成長率欄只在每年第一列輸出一格 rowspan 儲存格，其餘列為空字串"""
+    has_growth = growth.notna() & (growth != 0)
+    colors = np.where(has_growth, np.where(growth > 0, '#32CD32', '#FF4500'), '#AAAAAA')
+    texts = np.where(has_growth, growth.map(lambda x: f"{x:+.1f}%"), '-')
+    cells = [
+        f'<td rowspan="{span}" style="{QUARTERLY_GROWTH_TD_STYLE.format(color=color)}">{text}</td>' if first else ''
+        for first, span, color, text in zip(is_first, rowspan, colors, texts)
+    ]
+    return pd.Series(cells, index=growth.index)
+
+@profiled_cache(st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES))
+def render_quarterly_table_html(quarterly_df, theme):
+    """將季度稼動率表轉為含年成長率合併儲存格的 HTML 表格，依表格內容與主題快取"""
+    colors = THEMES[theme]
+    years = quarterly_df['Quarter'].str[:4]
+    is_first = ~years.duplicated()
+    rowspan = years.map(years.value_counts())
+    
+    headers = ['季度']
+    rows = '<tr style="border: 1px solid #E0E0E0;">' + f'<td style="{QUARTERLY_TD_STYLE}">' + quarterly_df['Quarter'] + '</td>'
+    
+    for charger_type in ['AC', 'DC']:
+        if charger_type not in quarterly_df.columns:
+            continue
+        headers += [f'{charger_type}稼動率', f'{charger_type}年成長率']
+        values = quarterly_df[charger_type].map(lambda x: f"{x:.2f}")
+        rows = rows + f'<td style="{QUARTERLY_TD_STYLE} font-weight: 600;">' + values + '</td>'
+        
+        growth_col = f'{charger_type}年成長率'
+        if growth_col in quarterly_df.columns:
+            rows = rows + format_growth_cells(quarterly_df[growth_col], is_first, rowspan)
+    
+    header_html = ''.join(f'<th style="{QUARTERLY_TH_STYLE}">{h}</th>' for h in headers)
+    return (
+        '<table style="width:100%; border-collapse: collapse; text-align: center; background: white; border-radius: 8px; overflow: hidden;">'
+        f'<thead><tr style="background: linear-gradient(135deg, {colors["primary"]} 0%, {colors["secondary"]} 100%); color: white; font-weight: bold;">'
+        f'{header_html}</tr></thead><tbody>'
+        + ''.join(rows + '</tr>')
+        + '</tbody></table>'
+    )
+
+MAP_HEIGHT = 500
+MAP_CACHE_MAX_ENTRIES = 32
+
+@profiled_cache(st.cache_resource(ttl=CACHE_TTL_SECONDS, max_entries=MAP_CACHE_MAX_ENTRIES))
+def render_map_html(center_lat, center_lon, radius_km, filters, data_version, _nearby_stations, target_address):
+    """以搜尋座標、半徑、篩選條件與資料版本為鍵快取地圖 HTML，其他元件互動時不重建地圖"""
+    import folium
+    
+    map_obj = create_map(center_lat, center_lon, _nearby_stations, target_address, radius_km)
+    return folium.Figure().add_child(map_obj).render()
+
 def render_utilization_gauge(value, label, color):
     """渲染稼動率儀表板"""
     if value >= 0.7:
@@ -947,6 +1162,71 @@ def render_utilization_gauge(value, label, color):
     </div>
     """, unsafe_allow_html=True)
 
+# ==================== 背景預熱 ====================
+# 預熱內容與使用者登入後的預設畫面一致：預設充電度數、不篩選的平均稼動率與預設主題
+WARMUP_AC_CAPACITY = 7
+WARMUP_DC_CAPACITY = 30
+WARMUP_THEME = "商務灰"
+WARMUP_THREAD_NAME = "cache-warmup"
+# 預熱執行緒不屬於任何 session，呼叫快取函式時 Streamlit 會以此 logger 警告缺少 ScriptRunContext
+SCRIPT_RUN_CONTEXT_LOGGER = "streamlit.runtime.scriptrunner_utils.script_run_context"
+
+def drop_warmup_thread_records(record):
+    """預熱執行緒沒有 ScriptRunContext 是預期情況，只略過該執行緒的紀錄，其他執行緒的警告照常輸出"""
+    return record.threadName != WARMUP_THREAD_NAME
+
+def warm_up_caches(data_version):
+    """在背景執行緒載入資料倉（資料、稼動率明細與各索引），並預先計算不篩選的平均稼動率季度表"""
+    start = time.perf_counter()
+    try:
+        store = load_data_store(data_version)
+        if not store['utilization'].empty:
+            utilization_cube = build_utilization_cube(store['stations'], store['utilization'], data_version=data_version)
+            quarterly_data = query_utilization_cube(
+                utilization_cube,
+                {'area_type': '全部', 'location_type': '全部', 'city': '全部', 'project_type': '全部'},
+                WARMUP_AC_CAPACITY,
+                WARMUP_DC_CAPACITY
+            )
+            if not quarterly_data.empty:
+                render_quarterly_table_html(quarterly_data, WARMUP_THEME)
+        logger.info("背景預熱完成（資料版本 %s），耗時 %.2f 秒", data_version, time.perf_counter() - start)
+    except Exception:
+        logger.exception("背景預熱失敗，改由第一個使用者的請求計算")
+
+@st.cache_resource(ttl=CACHE_TTL_SECONDS)
+def start_background_warmup(data_version):
+    """每個資料版本（及快取到期後）只啟動一次預熱執行緒，呼叫端不等待預熱完成"""
+    context_logger = logging.getLogger(SCRIPT_RUN_CONTEXT_LOGGER)
+    # 腳本每次重跑都會重新定義函式，以名稱判斷是否已掛上過濾器
+    if not any(getattr(f, '__name__', None) == drop_warmup_thread_records.__name__ for f in context_logger.filters):
+        context_logger.addFilter(drop_warmup_thread_records)
+    
+    thread = threading.Thread(target=warm_up_caches, args=(data_version,), name=WARMUP_THREAD_NAME, daemon=True)
+    thread.start()
+    return thread
+
+# ==================== 主程式 ====================
+
+# Streamlit 沒有伺服器啟動時的掛勾，由程序中第一次執行腳本（通常是登入頁）啟動背景預熱；
+# 預熱使用的快取函式定義在此之前，登入頁 st.stop() 前即可開始計算
+if runtime.exists():
+    start_background_warmup(get_dataset_version())
+
+if not check_login():
+    login_page()
+    st.stop()
+
+# 管理者開啟量測時記錄本次重跑各階段耗時與快取命中情形
+rerun_profile = start_rerun_profile()
+
+# 初始化主題
+if 'current_theme' not in st.session_state:
+    st.session_state.current_theme = "商務灰"
+
+# 自定義 CSS - 根據選擇的主題
+st.markdown(get_theme_css(st.session_state.current_theme), unsafe_allow_html=True)
+
 def main():
     # 標題列
     header_col1, header_col2, header_col3 = st.columns([4, 1, 1])
@@ -974,9 +1254,15 @@ def main():
     
     st.markdown("---")
     
-    # 載入資料（在分頁選擇之前）
-    stations_df = load_station_data()
-    usage_df = load_usage_data()
+    # 載入資料（在分頁選擇之前）；資料與索引皆取自跨 session 共用的資料倉
+    with profile_stage("資料載入"):
+        station_version, usage_version = get_dataset_version()
+        data_version = (station_version, usage_version)
+        store = load_data_store(data_version)
+        stations_df = store['stations']
+        station_index = store['station_index']
+        station_filter_index = store['filter_index']
+        station_search_index = store['search_index']
     
     if stations_df.empty:
         st.warning("無充電站資料")
@@ -988,14 +1274,10 @@ def main():
     if 'dc_capacity' not in st.session_state:
         st.session_state.dc_capacity = 30
     
-    utilization_df = pd.DataFrame()
-    if not usage_df.empty:
-        utilization_df = calculate_utilization_rate(
-            stations_df, 
-            usage_df, 
-            st.session_state.ac_capacity,
-            st.session_state.dc_capacity
-        )
+    # 稼動率明細為資料倉中的共用物件，容量換算只套用在查詢出的少量列上
+    utilization_df = store['utilization']
+    utilization_index = store['utilization_index']
+    station_timelines = store['station_timelines']
     
     # 初始化當前分頁狀態
     if 'current_tab' not in st.session_state:
@@ -1105,6 +1387,19 @@ def main():
     
     # ===== 分頁1: 拓點評估 =====
     if st.session_state.current_tab == "拓點評估":
+        # 批次評估一律採用側邊欄目前的設定；下方單點結果會改用上一次搜尋保存的條件，需先保留一份
+        batch_settings = {
+            'radius_km': search_radius,
+            'ac_capacity': ac_capacity,
+            'dc_capacity': dc_capacity,
+            'filters': {
+                'area_type': selected_area,
+                'location_type': selected_location,
+                'city': selected_city,
+                'project_type': selected_project
+            }
+        }
+        
         if search_button:
             if manual_lat is None or manual_lon is None:
                 st.warning("⚠️ 請輸入經緯度座標")
@@ -1113,15 +1408,6 @@ def main():
                 st.session_state.ac_capacity = ac_capacity
                 st.session_state.dc_capacity = dc_capacity
                 
-                # 重新計算稼動率（使用新參數）
-                if not usage_df.empty:
-                    utilization_df = calculate_utilization_rate(
-                        stations_df, 
-                        usage_df, 
-                        ac_capacity,
-                        dc_capacity
-                    )
-                
                 st.session_state.search_executed = True
                 st.session_state.search_lat = manual_lat
                 st.session_state.search_lon = manual_lon
@@ -1141,19 +1427,18 @@ def main():
             selected_project = st.session_state.get('selected_project', '全部')
             
             with st.spinner("🔄 正在分析地點..."):
-                nearby = find_nearby_stations(lat, lon, stations_df, search_radius)
-                
-                # 應用篩選條件
-                if selected_area != '全部' and 'area_type' in nearby.columns:
-                    nearby = nearby[nearby['area_type'] == selected_area]
-                if selected_location != '全部' and 'location_type' in nearby.columns:
-                    nearby = nearby[nearby['location_type'] == selected_location]
-                if selected_city != '全部' and 'city' in nearby.columns:
-                    nearby = nearby[nearby['city'] == selected_city]
-                if selected_project != '全部' and 'project_type' in nearby.columns:
-                    nearby = nearby[nearby['project_type'] == selected_project]
-                
-                st.session_state.nearby_stations = nearby
+                # 篩選條件在索引上以站點位置交集，只取出最後符合的站點
+                with profile_stage("附近站點搜尋"):
+                    nearby = find_nearby_stations(
+                        lat, lon, stations_df, search_radius, station_index, data_version=station_version,
+                        filters={
+                            'area_type': selected_area,
+                            'location_type': selected_location,
+                            'city': selected_city,
+                            'project_type': selected_project
+                        },
+                        _filter_index=station_filter_index
+                    )
             
             st.subheader(f"📊 評估結果")
             st.caption(f"座標：{lat:.4f}, {lon:.4f} | 搜尋半徑：{search_radius} km")
@@ -1181,7 +1466,12 @@ def main():
                 st.subheader("📈 區域稼動率表現")
                 
                 nearby_stations = nearby['station_id'].tolist()
-                nearby_util = utilization_df[utilization_df['Station'].isin(nearby_stations)]
+                with profile_stage("稼動率計算"):
+                    nearby_util = apply_capacity(
+                        select_utilization_rows(utilization_df, utilization_index, nearby_stations),
+                        st.session_state.ac_capacity,
+                        st.session_state.dc_capacity
+                    )
                 
                 if not nearby_util.empty:
                     latest_quarter = nearby_util['Quarter'].max()
@@ -1209,8 +1499,13 @@ def main():
             with map_col:
                 st.subheader("🗺️ 地圖視圖")
                 target_address = f"座標: ({lat:.4f}, {lon:.4f})"
-                map_obj = create_map(lat, lon, nearby, target_address, search_radius)
-                folium_static(map_obj, width=600, height=500)
+                with profile_stage("地圖建立"):
+                    map_html = render_map_html(
+                        lat, lon, search_radius,
+                        (selected_area, selected_location, selected_city, selected_project),
+                        station_version, nearby, target_address
+                    )
+                components.html(map_html, width=600, height=MAP_HEIGHT + 10)
             
             with station_col:
                 st.subheader("🔍 單站詳細資訊")
@@ -1246,17 +1541,17 @@ def main():
                                 st.markdown(f"**標案性質**  \n📋 {station_info['project_type']}")
                         
                         if not utilization_df.empty:
-                            station_util = utilization_df[utilization_df['Station'] == selected_id]
-                            
-                            if not station_util.empty:
+                            if selected_id in station_timelines['slices']:
                                 st.markdown("#### 📊 稼動率歷史")
                                 
-                                quarterly_single = calculate_quarterly_utilization(
-                                    utilization_df, 
-                                    [selected_id],
-                                    st.session_state.ac_capacity,
-                                    st.session_state.dc_capacity
-                                )
+                                # 單站歷史直接取預先彙總的時間序列，不需掃描稼動率明細
+                                with profile_stage("季度彙總"):
+                                    quarterly_single = lookup_station_timeline(
+                                        station_timelines,
+                                        selected_id,
+                                        st.session_state.ac_capacity,
+                                        st.session_state.dc_capacity
+                                    )
                                 
                                 if not quarterly_single.empty:
                                     display_df = quarterly_single[['Quarter']].copy()
@@ -1271,119 +1566,59 @@ def main():
             
             if not utilization_df.empty and len(nearby) > 0:
                 with st.expander("📈 查看區域歷季趨勢詳細資料"):
-                    quarterly_df = calculate_quarterly_utilization(
-                        utilization_df, 
-                        nearby_stations,
-                        st.session_state.ac_capacity,
-                        st.session_state.dc_capacity
-                    )
+                    with profile_stage("季度彙總"):
+                        quarterly_df = calculate_quarterly_utilization(
+                            utilization_df, 
+                            utilization_index,
+                            nearby_stations,
+                            st.session_state.ac_capacity,
+                            st.session_state.dc_capacity,
+                            data_version=data_version
+                        )
                     
                     if not quarterly_df.empty:
-                        fig = go.Figure()
-                        
-                        if 'AC' in quarterly_df.columns:
-                            fig.add_trace(go.Scatter(
-                                x=quarterly_df['Quarter'],
-                                y=quarterly_df['AC'],
-                                mode='lines+markers',
-                                name='AC稼動率',
-                                line=dict(color=THEMES[st.session_state.current_theme]['accent1'], width=3),
-                                marker=dict(size=8)
-                            ))
-                        
-                        if 'DC' in quarterly_df.columns:
-                            fig.add_trace(go.Scatter(
-                                x=quarterly_df['Quarter'],
-                                y=quarterly_df['DC'],
-                                mode='lines+markers',
-                                name='DC稼動率',
-                                line=dict(color=THEMES[st.session_state.current_theme]['accent2'], width=3),
-                                marker=dict(size=8)
-                            ))
-                        
-                        fig.update_layout(
-                            title='區域稼動率季度趨勢',
-                            xaxis_title='季度',
-                            yaxis_title='稼動率',
-                            height=400,
-                            hovermode='x unified',
-                            plot_bgcolor='white',
-                            paper_bgcolor='#F5F5F5'
-                        )
-                        
-                        st.plotly_chart(fig, use_container_width=True)
-                        
-                        st.markdown("#### 📋 數據表格")
-                        
-                        display_df = quarterly_df.copy()
-                        display_df['Year'] = display_df['Quarter'].str[:4]
-                        
-                        html_table = '<table style="width:100%; border-collapse: collapse; text-align: center; background: white; border-radius: 8px; overflow: hidden;">'
-                        html_table += '<thead><tr style="background: linear-gradient(135deg, ' + THEMES[st.session_state.current_theme]['primary'] + ' 0%, ' + THEMES[st.session_state.current_theme]['secondary'] + ' 100%); color: white; font-weight: bold;">'
-                        html_table += '<th style="padding: 12px; border: 1px solid #E0E0E0;">季度</th>'
-                        
-                        if 'AC' in display_df.columns:
-                            html_table += '<th style="padding: 12px; border: 1px solid #E0E0E0;">AC稼動率</th>'
-                            html_table += '<th style="padding: 12px; border: 1px solid #E0E0E0;">AC年成長率</th>'
-                        if 'DC' in display_df.columns:
-                            html_table += '<th style="padding: 12px; border: 1px solid #E0E0E0;">DC稼動率</th>'
-                            html_table += '<th style="padding: 12px; border: 1px solid #E0E0E0;">DC年成長率</th>'
-                        
-                        html_table += '</tr></thead><tbody>'
-                        
-                        year_counts = display_df['Year'].value_counts().sort_index()
-                        year_first_occurrence = {}
-                        
-                        for idx, row in display_df.iterrows():
-                            year = row['Year']
+                        with profile_stage("圖表建立"):
+                            # plotly 只在繪製趨勢圖時匯入，登入頁與地圖不必載入
+                            import plotly.graph_objects as go
                             
-                            if year not in year_first_occurrence:
-                                year_first_occurrence[year] = True
-                                is_first = True
-                            else:
-                                is_first = False
+                            fig = go.Figure()
                             
-                            html_table += '<tr style="border: 1px solid #E0E0E0;">'
-                            html_table += f'<td style="padding: 10px; border: 1px solid #E0E0E0; color: #333333;">{row["Quarter"]}</td>'
+                            if 'AC' in quarterly_df.columns:
+                                fig.add_trace(go.Scatter(
+                                    x=quarterly_df['Quarter'],
+                                    y=quarterly_df['AC'],
+                                    mode='lines+markers',
+                                    name='AC稼動率',
+                                    line=dict(color=THEMES[st.session_state.current_theme]['accent1'], width=3),
+                                    marker=dict(size=8)
+                                ))
                             
-                            if 'AC' in row:
-                                ac_value = row['AC']
-                                html_table += f'<td style="padding: 10px; border: 1px solid #E0E0E0; color: #333333; font-weight: 600;">{ac_value:.2f}</td>'
-                                
-                                if is_first and 'AC年成長率' in row:
-                                    ac_growth = row['AC年成長率']
-                                    rowspan = year_counts[year]
-                                    
-                                    if pd.notna(ac_growth) and ac_growth != 0:
-                                        color = '#32CD32' if ac_growth > 0 else '#FF4500'
-                                        growth_text = f"{ac_growth:+.1f}%"
-                                    else:
-                                        color = '#AAAAAA'
-                                        growth_text = '-'
-                                    
-                                    html_table += f'<td rowspan="{rowspan}" style="padding: 10px; border: 1px solid #E0E0E0; background-color: #F5F5F5; color: {color}; font-weight: bold; vertical-align: middle;">{growth_text}</td>'
+                            if 'DC' in quarterly_df.columns:
+                                fig.add_trace(go.Scatter(
+                                    x=quarterly_df['Quarter'],
+                                    y=quarterly_df['DC'],
+                                    mode='lines+markers',
+                                    name='DC稼動率',
+                                    line=dict(color=THEMES[st.session_state.current_theme]['accent2'], width=3),
+                                    marker=dict(size=8)
+                                ))
                             
-                            if 'DC' in row:
-                                dc_value = row['DC']
-                                html_table += f'<td style="padding: 10px; border: 1px solid #E0E0E0; color: #333333; font-weight: 600;">{dc_value:.2f}</td>'
-                                
-                                if is_first and 'DC年成長率' in row:
-                                    dc_growth = row['DC年成長率']
-                                    rowspan = year_counts[year]
-                                    
-                                    if pd.notna(dc_growth) and dc_growth != 0:
-                                        color = '#32CD32' if dc_growth > 0 else '#FF4500'
-                                        growth_text = f"{dc_growth:+.1f}%"
-                                    else:
-                                        color = '#AAAAAA'
-                                        growth_text = '-'
-                                    
-                                    html_table += f'<td rowspan="{rowspan}" style="padding: 10px; border: 1px solid #E0E0E0; background-color: #F5F5F5; color: {color}; font-weight: bold; vertical-align: middle;">{growth_text}</td>'
+                            fig.update_layout(
+                                title='區域稼動率季度趨勢',
+                                xaxis_title='季度',
+                                yaxis_title='稼動率',
+                                height=400,
+                                hovermode='x unified',
+                                plot_bgcolor='white',
+                                paper_bgcolor='#F5F5F5'
+                            )
                             
-                            html_table += '</tr>'
+                            st.plotly_chart(fig, use_container_width=True)
                         
-                        html_table += '</tbody></table>'
-                        st.markdown(html_table, unsafe_allow_html=True)
+                        st.markdown("#### 📋 數據表格")
+                        
+                        with profile_stage("表格輸出"):
+                            st.markdown(render_quarterly_table_html(quarterly_df, st.session_state.current_theme), unsafe_allow_html=True)
         else:
             st.info("👈 請在側邊欄設定評估條件並點擊「開始評估」")
             
@@ -1397,18 +1632,62 @@ def main():
                     total_ac = int(stations_df['ac_count'].sum())
                     total_dc = int(stations_df['dc_count'].sum())
                     st.metric("AC / DC 比例", f"{total_ac} / {total_dc}")
+        
+        st.markdown("---")
+        
+        with st.expander("📂 批次評估多個候選點", expanded=False):
+            st.caption(
+                f"上傳含緯度、經度欄位（latitude/longitude 或 緯度/經度，可另含 name 名稱欄）的 CSV，"
+                f"一律採用側邊欄目前的設定（不需先按開始評估）：搜尋半徑 {batch_settings['radius_km']} km、"
+                f"進階篩選條件，以及 AC={batch_settings['ac_capacity']}度/次 | DC={batch_settings['dc_capacity']}度/次"
+            )
+            candidate_file = st.file_uploader("候選點 CSV", type=['csv'], key="candidate_file")
+            
+            if candidate_file is not None:
+                candidates = parse_candidate_sites(candidate_file.getvalue())
+                
+                if candidates is None:
+                    st.error("❌ 無法讀取候選點檔案，請確認包含緯度與經度欄位")
+                elif candidates.empty:
+                    st.warning("⚠️ 檔案中沒有有效的候選點座標")
+                else:
+                    with st.spinner(f"🔄 正在評估 {len(candidates)} 個候選點..."):
+                        with profile_stage("批次候選點評估"):
+                            evaluated = evaluate_candidate_sites(
+                                candidates, stations_df, utilization_df, batch_settings['radius_km'],
+                                batch_settings['ac_capacity'], batch_settings['dc_capacity'],
+                                filters=batch_settings['filters'],
+                                _station_index=station_index,
+                                _filter_index=station_filter_index,
+                                data_version=data_version
+                            )
+                    
+                    sort_col, order_col = st.columns([2, 1])
+                    with sort_col:
+                        sort_by = st.selectbox("排序依據", options=CANDIDATE_SORT_OPTIONS, key="candidate_sort_by")
+                    with order_col:
+                        ascending = st.radio("排序方式", ["由高到低", "由低到高"], horizontal=True, key="candidate_sort_order") == "由低到高"
+                    
+                    ranked = rank_candidate_sites(evaluated, sort_by, ascending).rename(
+                        columns={'name': '候選點', 'latitude': '緯度', 'longitude': '經度'}
+                    )
+                    st.dataframe(
+                        ranked.round({'AC稼動率': 2, 'DC稼動率': 2}),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                    
+                    csv = ranked.to_csv(index=False, encoding='utf-8-sig')
+                    st.download_button(
+                        label="📥 下載評估結果 (CSV)",
+                        data=csv,
+                        file_name=f"批次拓點評估_{batch_settings['radius_km']}km.csv",
+                        mime="text/csv",
+                        key="candidate_download"
+                    )
     
     # ===== 分頁2: 平均稼動率 =====
     elif st.session_state.current_tab == "平均稼動率":
-        # 先檢查是否需要重新計算稼動率
-        if not usage_df.empty:
-            utilization_df = calculate_utilization_rate(
-                stations_df, 
-                usage_df, 
-                st.session_state.ac_capacity,
-                st.session_state.dc_capacity
-            )
-        
         if utilization_df.empty:
             st.warning("⚠️ 無稼動率資料")
             return
@@ -1489,19 +1768,24 @@ def main():
             help="模糊搜尋站點名稱，找到後可在下方選擇單站查看"
         )
         
+        selected_station_id = None
+        
         if station_name_search and station_name_search.strip():
             st.markdown("---")
             
-            search_results = stations_df[
-                stations_df['name'].str.contains(station_name_search.strip(), case=False, na=False)
-            ]
+            with profile_stage("站名搜尋"):
+                search_positions, match_count = query_station_search_index(station_search_index, station_name_search)
             
-            if len(search_results) > 0:
-                st.markdown(f"**找到 {len(search_results)} 個站點**，請選擇要查看的單站：")
+            if match_count > 0:
+                if match_count > len(search_positions):
+                    st.markdown(f"**找到 {match_count} 個站點**，僅列出最相關的 {len(search_positions)} 個，請選擇要查看的單站：")
+                else:
+                    st.markdown(f"**找到 {match_count} 個站點**，請選擇要查看的單站：")
                 
+                search_results = stations_df.iloc[search_positions]
                 station_options = {
-                    f"{row['name']} ({row['station_id']})": row['station_id'] 
-                    for _, row in search_results.iterrows()
+                    f"{name} ({station_id})": station_id
+                    for name, station_id in zip(search_results['name'].tolist(), search_results['station_id'].tolist())
                 }
                 
                 selected_station_display = st.selectbox(
@@ -1512,58 +1796,47 @@ def main():
                 
                 if selected_station_display != "請選擇站點...":
                     selected_station_id = station_options[selected_station_display]
-                    filtered_stations = stations_df[stations_df['station_id'] == selected_station_id]
                     st.success(f"✅ 已選擇單站：{selected_station_display}")
-                else:
-                    filtered_stations = stations_df.copy()
-                    
-                    # 應用通路篩選條件
-                    if filter_area != '全部' and 'area_type' in filtered_stations.columns:
-                        filtered_stations = filtered_stations[filtered_stations['area_type'] == filter_area]
-                    if filter_location != '全部' and 'location_type' in filtered_stations.columns:
-                        filtered_stations = filtered_stations[filtered_stations['location_type'] == filter_location]
-                    if filter_city != '全部' and 'city' in filtered_stations.columns:
-                        filtered_stations = filtered_stations[filtered_stations['city'] == filter_city]
-                    if filter_project != '全部' and 'project_type' in filtered_stations.columns:
-                        filtered_stations = filtered_stations[filtered_stations['project_type'] == filter_project]
             else:
                 st.warning(f"⚠️ 找不到包含「{station_name_search}」的站點")
-                filtered_stations = stations_df.copy()
-                
+        
+        channel_filters = {
+            'area_type': filter_area,
+            'location_type': filter_location,
+            'city': filter_city,
+            'project_type': filter_project
+        }
+        
+        with profile_stage("通路篩選"):
+            if selected_station_id is not None:
+                filtered_stations = stations_df[stations_df['station_id'] == selected_station_id]
+            else:
                 # 應用通路篩選條件
-                if filter_area != '全部' and 'area_type' in filtered_stations.columns:
-                    filtered_stations = filtered_stations[filtered_stations['area_type'] == filter_area]
-                if filter_location != '全部' and 'location_type' in filtered_stations.columns:
-                    filtered_stations = filtered_stations[filtered_stations['location_type'] == filter_location]
-                if filter_city != '全部' and 'city' in filtered_stations.columns:
-                    filtered_stations = filtered_stations[filtered_stations['city'] == filter_city]
-                if filter_project != '全部' and 'project_type' in filtered_stations.columns:
-                    filtered_stations = filtered_stations[filtered_stations['project_type'] == filter_project]
-        else:
-            filtered_stations = stations_df.copy()
+                filtered_stations = stations_df.iloc[query_station_filter_index(station_filter_index, channel_filters)]
             
-            # 應用通路篩選條件
-            if filter_area != '全部' and 'area_type' in filtered_stations.columns:
-                filtered_stations = filtered_stations[filtered_stations['area_type'] == filter_area]
-            if filter_location != '全部' and 'location_type' in filtered_stations.columns:
-                filtered_stations = filtered_stations[filtered_stations['location_type'] == filter_location]
-            if filter_city != '全部' and 'city' in filtered_stations.columns:
-                filtered_stations = filtered_stations[filtered_stations['city'] == filter_city]
-            if filter_project != '全部' and 'project_type' in filtered_stations.columns:
-                filtered_stations = filtered_stations[filtered_stations['project_type'] == filter_project]
-        
-        filtered_station_ids = filtered_stations['station_id'].tolist()
+            filtered_station_ids = filtered_stations['station_id'].tolist()
         
         if len(filtered_station_ids) == 0:
             st.warning("⚠️ 沒有符合篩選條件的站點")
             return
         
-        quarterly_data = calculate_quarterly_utilization(
-            utilization_df, 
-            filtered_station_ids,
-            st.session_state.ac_capacity,
-            st.session_state.dc_capacity
-        )
+        with profile_stage("季度彙總"):
+            if selected_station_id is not None:
+                quarterly_data = lookup_station_timeline(
+                    station_timelines,
+                    selected_station_id,
+                    st.session_state.ac_capacity,
+                    st.session_state.dc_capacity
+                )
+            else:
+                # 通路篩選直接查詢預先彙總的 cube，不需重新掃描稼動率明細
+                utilization_cube = build_utilization_cube(stations_df, utilization_df, data_version=data_version)
+                quarterly_data = query_utilization_cube(
+                    utilization_cube,
+                    channel_filters,
+                    st.session_state.ac_capacity,
+                    st.session_state.dc_capacity
+                )
         
         if quarterly_data.empty:
             st.info("📊 篩選條件下無稼動率資料")
@@ -1610,161 +1883,166 @@ def main():
         
         st.subheader("📊 稼動率趨勢分析")
         
-        fig = go.Figure()
-        
-        if 'AC' in quarterly_data.columns:
-            fig.add_trace(go.Scatter(
-                x=quarterly_data['Quarter'],
-                y=quarterly_data['AC'],
-                mode='lines+markers+text',
-                name='AC稼動率',
-                line=dict(color=THEMES[st.session_state.current_theme]['accent1'], width=3),
-                marker=dict(size=10, symbol='circle'),
-                text=[f"{val:.2f}" for val in quarterly_data['AC']],
-                textposition='top center',
-                textfont=dict(size=10, color='#333333'),
-                hovertemplate='<b>AC稼動率</b><br>季度: %{x}<br>稼動率: %{y:.2f}<extra></extra>'
-            ))
-        
-        if 'DC' in quarterly_data.columns:
-            fig.add_trace(go.Scatter(
-                x=quarterly_data['Quarter'],
-                y=quarterly_data['DC'],
-                mode='lines+markers+text',
-                name='DC稼動率',
-                line=dict(color=THEMES[st.session_state.current_theme]['accent2'], width=3),
-                marker=dict(size=10, symbol='square'),
-                text=[f"{val:.2f}" for val in quarterly_data['DC']],
-                textposition='bottom center',
-                textfont=dict(size=10, color='#333333'),
-                hovertemplate='<b>DC稼動率</b><br>季度: %{x}<br>稼動率: %{y:.2f}<extra></extra>'
-            ))
-        
-        fig.update_layout(
-            height=500,
-            hovermode='x unified',
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="center",
-                x=0.5
-            ),
-            xaxis=dict(title='季度'),
-            yaxis=dict(title='稼動率'),
-            plot_bgcolor='white',
-            paper_bgcolor='#F5F5F5',
-            font=dict(color='#333333')
-        )
-        
-        fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='#E0E0E0')
-        fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='#E0E0E0')
-        
-        st.plotly_chart(fig, use_container_width=True)
-        
-        with st.expander("📋 查看詳細數據表格", expanded=False):
-            display_data = quarterly_data.copy()
-            display_data['Year'] = display_data['Quarter'].str[:4]
+        with profile_stage("圖表建立"):
+            import plotly.graph_objects as go
+            
+            fig = go.Figure()
             
-            html_table = '<table style="width:100%; border-collapse: collapse; text-align: center; background: white; border-radius: 8px; overflow: hidden;">'
-            html_table += '<thead><tr style="background: linear-gradient(135deg, ' + THEMES[st.session_state.current_theme]['primary'] + ' 0%, ' + THEMES[st.session_state.current_theme]['secondary'] + ' 100%); color: white; font-weight: bold;">'
-            html_table += '<th style="padding: 12px; border: 1px solid #E0E0E0;">季度</th>'
+            if 'AC' in quarterly_data.columns:
+                fig.add_trace(go.Scatter(
+                    x=quarterly_data['Quarter'],
+                    y=quarterly_data['AC'],
+                    mode='lines+markers+text',
+                    name='AC稼動率',
+                    line=dict(color=THEMES[st.session_state.current_theme]['accent1'], width=3),
+                    marker=dict(size=10, symbol='circle'),
+                    text=[f"{val:.2f}" for val in quarterly_data['AC']],
+                    textposition='top center',
+                    textfont=dict(size=10, color='#333333'),
+                    hovertemplate='<b>AC稼動率</b><br>季度: %{x}<br>稼動率: %{y:.2f}<extra></extra>'
+                ))
             
-            if 'AC' in display_data.columns:
-                html_table += '<th style="padding: 12px; border: 1px solid #E0E0E0;">AC稼動率</th>'
-                html_table += '<th style="padding: 12px; border: 1px solid #E0E0E0;">AC年成長率</th>'
-            if 'DC' in display_data.columns:
-                html_table += '<th style="padding: 12px; border: 1px solid #E0E0E0;">DC稼動率</th>'
-                html_table += '<th style="padding: 12px; border: 1px solid #E0E0E0;">DC年成長率</th>'
+            if 'DC' in quarterly_data.columns:
+                fig.add_trace(go.Scatter(
+                    x=quarterly_data['Quarter'],
+                    y=quarterly_data['DC'],
+                    mode='lines+markers+text',
+                    name='DC稼動率',
+                    line=dict(color=THEMES[st.session_state.current_theme]['accent2'], width=3),
+                    marker=dict(size=10, symbol='square'),
+                    text=[f"{val:.2f}" for val in quarterly_data['DC']],
+                    textposition='bottom center',
+                    textfont=dict(size=10, color='#333333'),
+                    hovertemplate='<b>DC稼動率</b><br>季度: %{x}<br>稼動率: %{y:.2f}<extra></extra>'
+                ))
             
-            html_table += '</tr></thead><tbody>'
+            fig.update_layout(
+                height=500,
+                hovermode='x unified',
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.02,
+                    xanchor="center",
+                    x=0.5
+                ),
+                xaxis=dict(title='季度'),
+                yaxis=dict(title='稼動率'),
+                plot_bgcolor='white',
+                paper_bgcolor='#F5F5F5',
+                font=dict(color='#333333')
+            )
             
-            year_counts = display_data['Year'].value_counts().sort_index()
-            year_first_occurrence = {}
+            fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='#E0E0E0')
+            fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='#E0E0E0')
             
-            for idx, row in display_data.iterrows():
-                year = row['Year']
-                
-                if year not in year_first_occurrence:
-                    year_first_occurrence[year] = True
-                    is_first = True
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with st.expander("🎚️ 充電度數敏感度分析", expanded=False):
+            st.caption("一次比較多組 AC/DC 每次最大電量下，目前篩選條件最新季度的 AC 稼動率與 DC 稼動率（與上方趨勢圖相同定義）")
+            
+            sweep_col1, sweep_col2, sweep_col3 = st.columns([2, 2, 1])
+            with sweep_col1:
+                ac_sweep_range = st.slider(
+                    "AC 每次最大電量範圍 (度)",
+                    min_value=CAPACITY_LIMITS[0],
+                    max_value=CAPACITY_LIMITS[1],
+                    value=(1, 20),
+                    key="ac_sweep_range"
+                )
+            with sweep_col2:
+                dc_sweep_range = st.slider(
+                    "DC 每次最大電量範圍 (度)",
+                    min_value=CAPACITY_LIMITS[0],
+                    max_value=CAPACITY_LIMITS[1],
+                    value=(10, 60),
+                    key="dc_sweep_range"
+                )
+            with sweep_col3:
+                sweep_step = st.number_input("間距 (度)", min_value=1, max_value=20, value=1, step=1, key="sweep_step")
+            
+            with profile_stage("敏感度分析"):
+                # 稼動率與容量成反比，只需最新季度每種槍型的度數總和與筆數，即可一次廣播出所有容量值
+                if selected_station_id is not None:
+                    utilization_totals = summarize_utilization_rows(
+                        select_utilization_rows(utilization_df, utilization_index, [selected_station_id])
+                    )
                 else:
-                    is_first = False
+                    utilization_totals = query_utilization_totals(utilization_cube, channel_filters)
                 
-                html_table += '<tr style="border: 1px solid #E0E0E0;">'
-                html_table += f'<td style="padding: 10px; border: 1px solid #E0E0E0; color: #333333;">{row["Quarter"]}</td>'
+                sweep = sweep_capacity_grid(
+                    utilization_totals,
+                    capacity_values(*ac_sweep_range, sweep_step),
+                    capacity_values(*dc_sweep_range, sweep_step)
+                )
                 
-                if 'AC' in row:
-                    ac_value = row['AC']
-                    html_table += f'<td style="padding: 10px; border: 1px solid #E0E0E0; color: #333333; font-weight: 600;">{ac_value:.2f}</td>'
+                if sweep['quarter'] is None:
+                    st.info("📊 篩選條件下無稼動率資料")
+                else:
+                    import plotly.graph_objects as go
+                    from plotly.subplots import make_subplots
                     
-                    if is_first and 'AC年成長率' in row:
-                        ac_growth = row['AC年成長率']
-                        rowspan = year_counts[year]
-                        
-                        if pd.notna(ac_growth) and ac_growth != 0:
-                            color = '#32CD32' if ac_growth > 0 else '#FF4500'
-                            growth_text = f"{ac_growth:+.1f}%"
-                        else:
-                            color = '#AAAAAA'
-                            growth_text = '-'
+                    # AC、DC 稼動率各自只隨自己的容量變化，分上下兩個面板各畫一列熱圖，共用色階方便比較
+                    sweep_fig = make_subplots(rows=2, cols=1, subplot_titles=('AC稼動率', 'DC稼動率'), vertical_spacing=0.3)
+                    sweep_panels = [
+                        (1, 'AC', sweep['ac_values'], sweep['ac_rate'], st.session_state.ac_capacity),
+                        (2, 'DC', sweep['dc_values'], sweep['dc_rate'], st.session_state.dc_capacity)
+                    ]
+                    for row, charger_type, values, rates, current_capacity in sweep_panels:
+                        sweep_fig.add_trace(go.Heatmap(
+                            x=values,
+                            y=[charger_type],
+                            z=[rates],
+                            coloraxis='coloraxis',
+                            hovertemplate=f'{charger_type}: %{{x}} 度/次<br>{charger_type}稼動率: %{{z:.2f}}<extra></extra>'
+                        ), row=row, col=1)
                         
-                        html_table += f'<td rowspan="{rowspan}" style="padding: 10px; border: 1px solid #E0E0E0; background-color: #F5F5F5; color: {color}; font-weight: bold; vertical-align: middle;">{growth_text}</td>'
-                
-                if 'DC' in row:
-                    dc_value = row['DC']
-                    html_table += f'<td style="padding: 10px; border: 1px solid #E0E0E0; color: #333333; font-weight: 600;">{dc_value:.2f}</td>'
+                        # 標示目前採用的計算參數
+                        if values[0] <= current_capacity <= values[-1]:
+                            sweep_fig.add_trace(go.Scatter(
+                                x=[current_capacity],
+                                y=[charger_type],
+                                mode='markers',
+                                marker=dict(size=14, symbol='x', color='#333333'),
+                                hovertemplate=f'目前參數<br>{charger_type}: %{{x}} 度/次<extra></extra>'
+                            ), row=row, col=1)
+                        sweep_fig.update_xaxes(title_text=f'{charger_type} 每次最大電量 (度)', row=row, col=1)
                     
-                    if is_first and 'DC年成長率' in row:
-                        dc_growth = row['DC年成長率']
-                        rowspan = year_counts[year]
-                        
-                        if pd.notna(dc_growth) and dc_growth != 0:
-                            color = '#32CD32' if dc_growth > 0 else '#FF4500'
-                            growth_text = f"{dc_growth:+.1f}%"
-                        else:
-                            color = '#AAAAAA'
-                            growth_text = '-'
-                        
-                        html_table += f'<td rowspan="{rowspan}" style="padding: 10px; border: 1px solid #E0E0E0; background-color: #F5F5F5; color: {color}; font-weight: bold; vertical-align: middle;">{growth_text}</td>'
-                
-                html_table += '</tr>'
-            
-            html_table += '</tbody></table>'
-            st.markdown(html_table, unsafe_allow_html=True)
+                    sweep_fig.update_layout(
+                        height=400,
+                        title=f"最新季度 ({sweep['quarter']}) 稼動率敏感度",
+                        coloraxis=dict(colorscale='YlOrRd', colorbar=dict(title='稼動率')),
+                        showlegend=False,
+                        paper_bgcolor='#F5F5F5',
+                        font=dict(color='#333333')
+                    )
+                    
+                    st.plotly_chart(sweep_fig, use_container_width=True)
+        
+        with st.expander("📋 查看詳細數據表格", expanded=False):
+            with profile_stage("表格輸出"):
+                st.markdown(render_quarterly_table_html(quarterly_data, st.session_state.current_theme), unsafe_allow_html=True)
             
             st.markdown("---")
             
-            download_data = display_data.copy()
-            
-            if 'AC年成長率' in download_data.columns:
-                download_data['AC年成長率'] = download_data['AC年成長率'].apply(
-                    lambda x: f"{x:+.1f}%" if pd.notna(x) and x != 0 else "-"
-                )
-            if 'DC年成長率' in download_data.columns:
-                download_data['DC年成長率'] = download_data['DC年成長率'].apply(
-                    lambda x: f"{x:+.1f}%" if pd.notna(x) and x != 0 else "-"
-                )
-            
             rename_map = {
                 'Quarter': '季度',
                 'AC': 'AC稼動率',
-                'DC': 'DC稼動率',
-                'Year': '年份'
+                'DC': 'DC稼動率'
             }
-            download_data = download_data.rename(columns=rename_map)
             
             export_cols = ['季度']
-            if 'AC稼動率' in download_data.columns:
-                export_cols.append('AC稼動率')
-            if 'AC年成長率' in download_data.columns:
-                export_cols.append('AC年成長率')
-            if 'DC稼動率' in download_data.columns:
-                export_cols.append('DC稼動率')
-            if 'DC年成長率' in download_data.columns:
-                export_cols.append('DC年成長率')
+            for col in ['AC', 'AC年成長率', 'DC', 'DC年成長率']:
+                if col in quarterly_data.columns:
+                    export_cols.append(rename_map.get(col, col))
             
-            download_data = download_data[export_cols]
+            # 只在選出的匯出欄位上建立一份新表，成長率欄位直接以格式化結果取代
+            download_data = quarterly_data.rename(columns=rename_map)[export_cols]
+            for col in ['AC年成長率', 'DC年成長率']:
+                if col in download_data.columns:
+                    download_data[col] = download_data[col].apply(
+                        lambda x: f"{x:+.1f}%" if pd.notna(x) and x != 0 else "-"
+                    )
             
             # 建立檔案名稱
             filter_parts = []
@@ -1788,5 +2066,9 @@ def main():
             )
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        finish_rerun_profile(rerun_profile)
+    render_profile_panel(rerun_profile)
 
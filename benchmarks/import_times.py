@@ -0,0 +1,78 @@
+"""啟動匯入量測：在獨立程序中以 AppTest 執行登入頁、平均稼動率與拓點評估畫面，
+以 python -X importtime 記錄各畫面實際載入的重量級套件與匯入耗時
+
+用法（於專案根目錄執行）：
+    python -m benchmarks.import_times
+"""
+import os
+import re
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, 'app.py')
+
+# 只列出與畫面相關的頂層套件；streamlit 由 AppTest 本身載入，不計入
+TRACKED_MODULES = ['pandas', 'numpy', 'pyarrow', 'charging_analytics', 'folium', 'branca', 'jinja2', 'plotly']
+SCENARIOS = {
+    '登入頁': [],
+    '平均稼動率': ['login', 'utilization_tab'],
+    '拓點評估': ['login', 'evaluate']
+}
+
+SCENARIO_SCRIPT = """
+import sys
+from streamlit.testing.v1 import AppTest
+
+steps = sys.argv[2:]
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+if 'login' in steps:
+    at.session_state['logged_in'] = True
+at.run()
+if 'utilization_tab' in steps:
+    at.radio[0].set_value('📊 平均稼動率')
+    at.run()
+if 'evaluate' in steps:
+    next(b for b in at.button if '開始評估' in b.label).click()
+    at.run()
+if at.exception:
+    raise SystemExit(str(at.exception))
+"""
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+def measure_scenario(steps):
+    """在新的 Python 程序中執行一個畫面，回傳 {頂層套件: 累計匯入毫秒}；未載入的套件不會出現"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCENARIO_SCRIPT, APP_PATH] + steps,
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative_us, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        top_level = name.split('.')[0]
+        # 同一套件可能由不同位置分次載入，各次最外層的累計時間相加
+        if top_level in TRACKED_MODULES and (name == top_level or indent <= 1):
+            timings[top_level] = timings.get(top_level, 0) + cumulative_us / 1000
+    return timings
+
+def main():
+    results = {name: measure_scenario(steps) for name, steps in SCENARIOS.items()}
+
+    print(f"{'套件':<20}" + ''.join(f"{name:>14}" for name in SCENARIOS))
+    for module in TRACKED_MODULES:
+        cells = [
+            f"{results[name][module]:11.1f} ms" if module in results[name] else f"{'-':>14}"
+            for name in SCENARIOS
+        ]
+        print(f"{module:<20}" + ''.join(cells))
+    print("（- 表示該畫面未載入此套件）")
+
+if __name__ == '__main__':
+    main()
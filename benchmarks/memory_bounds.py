@@ -0,0 +1,102 @@
+"""每次互動的記憶體上限檢查：以合成資料量測附近站點搜尋與稼動率查詢的 tracemalloc 峰值，
+超過固定位元組上限即失敗（回傳碼 1）
+
+每次重跑只應取出被選到的列並產生小型結果表，峰值應與選取的站點數相關，而非整份資料量；
+因此上限是固定值，不隨資料量放大。若某個路徑又複製了整個 DataFrame，大資料量下就會超過上限。
+
+用法（於專案根目錄執行）：
+    python -m benchmarks.memory_bounds
+    python -m benchmarks.memory_bounds --stations 10000 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import charging_analytics as analytics
+from benchmarks.synthetic import CITY_CENTERS, write_synthetic_dataset
+
+DEFAULT_STATIONS = [10000, 50000]
+DEFAULT_QUARTERS = 12
+NEARBY_RADIUS_KM = 1
+NEARBY_STATION_COUNT = 30
+# 各互動的記憶體峰值上限（bytes）
+PEAK_BYTES_BOUNDS = {
+    '單站歷史稼動率': 256 * 1024,
+    '附近站點搜尋': 256 * 1024,
+    f'附近 {NEARBY_STATION_COUNT} 站稼動率明細': 256 * 1024,
+    f'附近 {NEARBY_STATION_COUNT} 站季度稼動率': 512 * 1024
+}
+
+def measure_peak(func):
+    """先執行一次排除首次呼叫的額外配置，再以 tracemalloc 量測第二次執行的記憶體峰值"""
+    func()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def build_interactions(n_stations, n_quarters, workdir):
+    """準備一組資料量的互動，回傳 (稼動率明細 bytes, [(名稱, 無參數函式)])"""
+    station_path, usage_path = write_synthetic_dataset(workdir, n_stations, n_quarters)
+    stations = analytics.load_station_data(station_path)
+    usage = analytics.load_usage_data(usage_path)
+    base = analytics.compute_utilization_base(stations, usage)
+    utilization_index = analytics.build_utilization_station_index(base)
+    timeline_store = analytics.build_station_timeline_store(base)
+    grid_index = analytics.build_station_grid_index(stations)
+
+    lat, lon = CITY_CENTERS['臺北市']
+    nearby = analytics.find_nearby_stations(lat, lon, stations, NEARBY_RADIUS_KM, grid_index)
+    nearby_ids = nearby['station_id'].tolist()[:NEARBY_STATION_COUNT]
+
+    interactions = [
+        ('單站歷史稼動率', lambda: analytics.lookup_station_timeline(timeline_store, nearby_ids[0], 7, 30)),
+        ('附近站點搜尋', lambda: analytics.find_nearby_stations(lat, lon, stations, NEARBY_RADIUS_KM, grid_index)),
+        (f'附近 {NEARBY_STATION_COUNT} 站稼動率明細', lambda: analytics.select_utilization_rows(
+            base, utilization_index, nearby_ids
+        )),
+        (f'附近 {NEARBY_STATION_COUNT} 站季度稼動率', lambda: analytics.calculate_quarterly_utilization(
+            base, utilization_index, nearby_ids, 7, 30
+        ))
+    ]
+    return int(base.memory_usage(deep=True).sum()), interactions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='每次互動的記憶體上限檢查')
+    parser.add_argument('--stations', type=int, nargs='+', default=DEFAULT_STATIONS, help='站點數（可多個）')
+    parser.add_argument('--quarters', type=int, default=DEFAULT_QUARTERS, help='季度數')
+    args = parser.parse_args(argv)
+
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_stations in args.stations:
+            size_key = f"{n_stations}x{args.quarters}q"
+            base_bytes, interactions = build_interactions(n_stations, args.quarters, os.path.join(workdir, size_key))
+            print(f"{size_key:>14}  稼動率明細共 {base_bytes / 1024 / 1024:.2f} MB")
+            for name, func in interactions:
+                peak = measure_peak(func)
+                bound = PEAK_BYTES_BOUNDS[name]
+                status = 'OK' if peak <= bound else '超出上限'
+                print(f"{size_key:>14}  {name:<24} {peak / 1024:10.1f} KB / 上限 {bound / 1024:.0f} KB  {status}")
+                if peak > bound:
+                    failures.append(f"{size_key} {name}: {peak / 1024:.1f} KB > {bound / 1024:.0f} KB")
+
+    if failures:
+        print("記憶體峰值超出上限：")
+        for line in failures:
+            print(f"  {line}")
+        return 1
+    print("所有互動的記憶體峰值皆在上限內")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
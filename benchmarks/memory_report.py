@@ -0,0 +1,42 @@
+"""讀取資料檔時 dtype 壓縮的記憶體報表：逐欄列出壓縮前後的 dtype 與 memory_usage(deep=True) 位元組數
+
+與載入函式走同一段整理與壓縮流程，但直接解析 CSV，不讀取 Feather 快取。
+
+用法（於專案根目錄執行）：
+    python -m benchmarks.memory_report
+    python -m benchmarks.memory_report --stations-path data/stations.csv --usage-path data/usedata.csv
+"""
+import argparse
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from charging_analytics import data
+
+def build_reports(stations_path, usage_path):
+    """回傳 [(名稱, 報表)]，報表格式同 compact_with_memory_report"""
+    stations = data.normalize_station_frame(data.read_csv_auto_encoding(stations_path))
+    usage = data.normalize_usage_frame(data.read_csv_auto_encoding(usage_path))
+    reports = []
+    if stations is not None:
+        reports.append((f'站點資料 {stations_path}', data.compact_with_memory_report(stations, data.compact_station_frame)[1]))
+    reports.append((f'使用資料 {usage_path}', data.compact_with_memory_report(usage, data.compact_usage_frame)[1]))
+    return reports
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='資料檔 dtype 壓縮的逐欄記憶體報表')
+    parser.add_argument('--stations-path', default=data.STATION_DATA_PATH, help='站點 CSV 路徑')
+    parser.add_argument('--usage-path', default=data.USAGE_DATA_PATH, help='使用資料 CSV 路徑')
+    args = parser.parse_args(argv)
+
+    for name, report in build_reports(args.stations_path, args.usage_path):
+        print(name)
+        print(report.to_string())
+        print()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
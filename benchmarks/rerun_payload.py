@@ -0,0 +1,128 @@
+"""每次重跑傳送到瀏覽器的資料量：啟動 Streamlit 伺服器並以 WebSocket 模擬瀏覽器，
+登入後量測各次重跑收到的 ForwardMsg 位元組數，以及其中樣式（<style>）區塊所佔的量
+
+與瀏覽器相同，客戶端會回報已快取的訊息雜湊，伺服器對這些訊息只送出雜湊參照。
+
+用法（於專案根目錄執行，需要 websockets 套件）：
+    python -m benchmarks.rerun_payload
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGIN_USERNAME = "EVALUE"
+LOGIN_PASSWORD = "EVALUE2025"
+SERVER_START_TIMEOUT = 30
+
+def find_free_port():
+    """向系統要一個未使用的連接埠"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(port):
+    """以 headless 模式啟動 app.py，等到可以連線後回傳程序"""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', 'app.py', '--server.headless', 'true',
+         '--server.port', str(port), '--browser.gatherUsageStats', 'false'],
+        cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + SERVER_START_TIMEOUT
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Streamlit 伺服器未能在時限內啟動")
+
+class BrowserSession:
+    """最小化的瀏覽器端：送出重跑請求、記錄收到的訊息，並保留可快取訊息的雜湊"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.cached_hashes = set()
+        self.widget_ids = {}
+
+    async def rerun(self, widget_values=None, triggers=()):
+        """送出一次重跑並收到腳本完成為止（含 st.rerun 觸發的後續重跑），回傳 (總位元組, 樣式位元組)"""
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.page_script_hash = ""
+        message.rerun_script.cached_message_hashes.extend(sorted(self.cached_hashes))
+        for key, value in (widget_values or {}).items():
+            state = message.rerun_script.widget_states.widgets.add()
+            state.id = self.widget_ids[key]
+            state.string_value = value
+        for key in triggers:
+            state = message.rerun_script.widget_states.widgets.add()
+            state.id = self.widget_ids[key]
+            state.trigger_value = True
+        await self.websocket.send(message.SerializeToString())
+
+        total_bytes = 0
+        style_bytes = 0
+        while True:
+            data = await asyncio.wait_for(self.websocket.recv(), 120)
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            total_bytes += len(data)
+
+            if forward.metadata.cacheable:
+                self.cached_hashes.add(forward.hash)
+            if forward.WhichOneof('type') == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                kind = element.WhichOneof('type')
+                if kind == 'markdown' and '<style>' in element.markdown.body:
+                    style_bytes += len(data)
+                widget = getattr(element, kind, None)
+                widget_id = getattr(widget, 'id', '')
+                if widget_id:
+                    # 元件 ID 以使用者指定的 key 結尾
+                    self.widget_ids[widget_id.rsplit('-', 1)[-1]] = widget_id
+            if (forward.WhichOneof('type') == 'script_finished'
+                    and forward.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY):
+                return total_bytes, style_bytes
+
+async def measure(port):
+    """依序量測登入頁與主畫面各次重跑的資料量"""
+    results = []
+    async with websockets.connect(
+        f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"], max_size=None
+    ) as websocket:
+        browser = BrowserSession(websocket)
+        results.append(('登入頁首次載入', await browser.rerun()))
+        results.append(('登入頁重跑（輸入帳號）', await browser.rerun({'username_input': LOGIN_USERNAME})))
+        results.append(('登入並載入主畫面', await browser.rerun(
+            {'username_input': LOGIN_USERNAME, 'password_input': LOGIN_PASSWORD}, triggers=['login_button']
+        )))
+        for i in range(3):
+            results.append((f'主畫面重跑 #{i + 1}', await browser.rerun()))
+        results.append(('切換主題', await browser.rerun({'theme_selector': '經典藍'})))
+        results.append(('切換主題後重跑', await browser.rerun({'theme_selector': '經典藍'})))
+    return results
+
+def main():
+    port = find_free_port()
+    process = start_server(port)
+    try:
+        results = asyncio.run(measure(port))
+    finally:
+        process.terminate()
+        process.wait()
+
+    print(f"{'重跑':<24}{'總位元組':>12}{'樣式位元組':>12}")
+    for name, (total_bytes, style_bytes) in results:
+        print(f"{name:<24}{total_bytes:>12,}{style_bytes:>12,}")
+
+if __name__ == '__main__':
+    main()
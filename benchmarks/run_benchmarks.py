@@ -0,0 +1,203 @@
+"""分析熱點效能測試：以合成資料量測各函式在不同資料量下的執行時間與記憶體峰值，並與基準檔比較
+
+用法（於專案根目錄執行）：
+    python -m benchmarks.run_benchmarks                  # 執行並與 benchmarks/baseline.json 比較
+    python -m benchmarks.run_benchmarks --save-baseline  # 執行並覆寫基準檔
+    python -m benchmarks.run_benchmarks --stations 1000 20000 --quarters 8
+
+基準數值與執行環境有關，更換機器或套件版本後應重新產生基準檔。
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import charging_analytics as analytics
+from benchmarks.synthetic import CITY_CENTERS, write_synthetic_dataset
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_STATIONS = [1000, 10000, 50000]
+DEFAULT_QUARTERS = 12
+DEFAULT_REPEAT = 5
+# 時間受機器負載影響較大，容許範圍較寬；記憶體峰值穩定，容許範圍較窄
+TIME_TOLERANCE = 0.5
+MEMORY_TOLERANCE = 0.2
+# 低於此值的量測差異視為雜訊，不判定為退步
+MIN_TIME_SECONDS = 0.002
+MIN_PEAK_BYTES = 256 * 1024
+
+def measure(func, repeat):
+    """回傳 (最佳執行秒數, 中位數秒數, tracemalloc 記憶體峰值 bytes)；記憶體另外執行一次量測，不影響計時"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(timings), float(np.median(timings)), peak
+
+def load_ui_module():
+    """匯入 app.py 取得地圖與 HTML 表格函式；在 bare 模式下執行時 Streamlit 只會輸出警告"""
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    import app
+    return app
+
+def build_cases(n_stations, n_quarters, workdir, app):
+    """準備一組資料量的量測項目，回傳 [(名稱, 無參數函式)]"""
+    station_path, usage_path = write_synthetic_dataset(workdir, n_stations, n_quarters)
+
+    def load_stations_cold():
+        cache_path = analytics.data.get_compiled_cache_path(station_path)
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        return analytics.load_station_data(station_path)
+
+    def load_usage_cold():
+        cache_path = analytics.data.get_compiled_cache_path(usage_path)
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        return analytics.load_usage_data(usage_path)
+
+    stations = load_stations_cold()
+    usage = load_usage_cold()
+    base = analytics.compute_utilization_base(stations, usage)
+    utilization_index = analytics.build_utilization_station_index(base)
+    grid_index = analytics.build_station_grid_index(stations)
+    filter_index = analytics.build_station_filter_index(stations)
+    station_ids = stations['station_id'].tolist()
+
+    lat, lon = CITY_CENTERS['臺北市']
+    nearby = analytics.find_nearby_stations(lat, lon, stations, 5, grid_index)
+    quarterly_table = analytics.calculate_quarterly_utilization(base, utilization_index, station_ids, 7, 30)
+
+    rng = np.random.default_rng(0)
+    centers = np.array(list(CITY_CENTERS.values()))
+    points = centers[rng.integers(0, len(centers), 100)] + rng.normal(0, 0.05, (100, 2))
+    candidates = pd.DataFrame({
+        'name': [f"候選點 {i + 1}" for i in range(len(points))],
+        'latitude': points[:, 0],
+        'longitude': points[:, 1]
+    })
+
+    def nearby_queries():
+        for point_lat, point_lon in points:
+            analytics.find_nearby_stations(point_lat, point_lon, stations, 5, grid_index)
+
+    return [
+        ('load_station_data (CSV)', load_stations_cold),
+        ('load_station_data (Feather)', lambda: analytics.load_station_data(station_path)),
+        ('load_usage_data (CSV)', load_usage_cold),
+        ('load_usage_data (Feather)', lambda: analytics.load_usage_data(usage_path)),
+        ('calculate_utilization_rate', lambda: analytics.calculate_utilization_rate(stations, usage, 7, 30)),
+        ('calculate_quarterly_utilization (all stations)', lambda: analytics.calculate_quarterly_utilization(
+            base, utilization_index, station_ids, 7, 30
+        )),
+        ('build_station_grid_index', lambda: analytics.build_station_grid_index(stations)),
+        ('find_nearby_stations x100 (5 km)', nearby_queries),
+        ('evaluate_candidate_sites x100 (5 km)', lambda: analytics.evaluate_candidate_sites(
+            candidates, stations, base, 5, 7, 30, station_index=grid_index, filter_index=filter_index
+        )),
+        (f'create_map ({len(nearby)} stations)', lambda: app.create_map(lat, lon, nearby, '評估地點', 5).get_root().render()),
+        ('render_quarterly_table_html', lambda: app.render_quarterly_table_html.__wrapped__(quarterly_table, '商務灰'))
+    ]
+
+def run(stations_sizes, n_quarters, repeat):
+    """依序執行各資料量的量測，回傳可寫成 JSON 的結果"""
+    app = load_ui_module()
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_stations in stations_sizes:
+            size_key = f"{n_stations}x{n_quarters}q"
+            results[size_key] = {}
+            for name, func in build_cases(n_stations, n_quarters, os.path.join(workdir, size_key), app):
+                # 地圖的站點數隨資料量改變，名稱統一後才能與基準比較
+                key = 'create_map (5 km)' if name.startswith('create_map') else name
+                best, median, peak = measure(func, repeat)
+                results[size_key][key] = {'best_seconds': best, 'median_seconds': median, 'peak_bytes': peak}
+                print(f"{size_key:>14}  {key:<48} {best * 1000:10.2f} ms  {peak / 1024 / 1024:9.2f} MB")
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine()
+        },
+        'quarters': n_quarters,
+        'results': results
+    }
+
+def compare_with_baseline(report, baseline):
+    """回傳超出容許範圍的退步項目說明；基準檔中沒有的項目略過"""
+    regressions = []
+    for size_key, cases in report['results'].items():
+        for name, current in cases.items():
+            previous = baseline.get('results', {}).get(size_key, {}).get(name)
+            if previous is None:
+                continue
+
+            time_limit = max(previous['best_seconds'] * (1 + TIME_TOLERANCE), MIN_TIME_SECONDS)
+            if current['best_seconds'] > time_limit:
+                regressions.append(
+                    f"{size_key} {name}: {previous['best_seconds'] * 1000:.2f} ms -> {current['best_seconds'] * 1000:.2f} ms"
+                )
+
+            memory_limit = max(previous['peak_bytes'] * (1 + MEMORY_TOLERANCE), MIN_PEAK_BYTES)
+            if current['peak_bytes'] > memory_limit:
+                regressions.append(
+                    f"{size_key} {name}: peak {previous['peak_bytes'] / 1024 / 1024:.2f} MB -> {current['peak_bytes'] / 1024 / 1024:.2f} MB"
+                )
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='充電站分析效能測試')
+    parser.add_argument('--stations', type=int, nargs='+', default=DEFAULT_STATIONS, help='站點數（可多個）')
+    parser.add_argument('--quarters', type=int, default=DEFAULT_QUARTERS, help='季度數')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='每項重複次數，取最佳值')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='基準檔路徑')
+    parser.add_argument('--save-baseline', action='store_true', help='以本次結果覆寫基準檔')
+    args = parser.parse_args(argv)
+
+    report = run(args.stations, args.quarters, args.repeat)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"已寫入基準檔 {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"找不到基準檔 {args.baseline}，請先以 --save-baseline 產生")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(report, baseline)
+    if regressions:
+        print("效能退步：")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("與基準相比沒有超出容許範圍的退步")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
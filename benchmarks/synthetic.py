@@ -0,0 +1,103 @@
+"""產生與 data/stations.csv、data/usedata.csv 相同欄位格式的合成資料，供效能測試使用"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# 站點集中在主要城市周圍，附近站點數才會接近實際分布
+CITY_CENTERS = {
+    '臺北市': (25.0375, 121.5637),
+    '新北市': (25.0120, 121.4650),
+    '桃園市': (24.9936, 121.3010),
+    '新竹市': (24.8039, 120.9647),
+    '臺中市': (24.1477, 120.6736),
+    '臺南市': (22.9999, 120.2270),
+    '高雄市': (22.6273, 120.3014),
+    '宜蘭縣': (24.7021, 121.7378),
+    '花蓮縣': (23.9872, 121.6015),
+    '屏東縣': (22.6690, 120.4862)
+}
+AREA_TYPES = ['商業區', '交通幹道區', '住宅區', '風景區', '辦公區']
+LOCATION_TYPES = ['車廠', '高球場', '景點', '科學園區', '商辦', '停車場', '公園', '飯店', '醫院', '賣場']
+PROJECT_TYPES = ['無', '臺北市標案', '新北市標案', '桃園市標案', '臺中市標案']
+MANAGERS = ['無', 'Anita', 'Ivan', 'Xana', 'Kathy']
+STATION_TYPES = {'AC': '純AC站', 'DC': '純DC站', 'MIX': 'AC+DC站'}
+CONNECTOR_TYPES = {'AC': 'J1772、TYPE2', 'DC': 'CCS1', 'MIX': 'J1772、TYPE2、CCS1'}
+
+def generate_stations(n_stations, ac_share=0.6, dc_share=0.25, first_year=2020, seed=0):
+    """產生站點資料（原始中文欄位名稱）；ac_share/dc_share 為純 AC/純 DC 站比例，其餘為 AC+DC 站"""
+    rng = np.random.default_rng(seed)
+    cities = list(CITY_CENTERS)
+    city = rng.choice(cities, n_stations)
+    centers = np.array([CITY_CENTERS[c] for c in city])
+
+    kind = rng.choice(['AC', 'DC', 'MIX'], n_stations, p=[ac_share, dc_share, 1 - ac_share - dc_share])
+    ac_count = np.where(kind == 'DC', 0, rng.integers(1, 9, n_stations))
+    dc_count = np.where(kind == 'AC', 0, rng.integers(1, 5, n_stations))
+
+    location = rng.choice(LOCATION_TYPES, n_stations)
+    install_days = rng.integers(0, (2025 - first_year) * 365, n_stations)
+    install_date = pd.Timestamp(year=first_year, month=1, day=1) + pd.to_timedelta(install_days, unit='D')
+
+    return pd.DataFrame({
+        '負責人': rng.choice(MANAGERS, n_stations),
+        '站ID': [f"S{i:07d}" for i in range(n_stations)],
+        '站點規格': [STATION_TYPES[k] for k in kind],
+        '啟用日期': [f"{d.year}/{d.month}/{d.day}" for d in install_date],
+        '名稱': [f"{c}{loc}{i}號站" for i, (c, loc) in enumerate(zip(city, location))],
+        '充電槍數': ac_count + dc_count,
+        'AC槍數量': ac_count,
+        'DC槍數量': dc_count,
+        '槍頭規格': [CONNECTOR_TYPES[k] for k in kind],
+        '經度': centers[:, 1] + rng.normal(0, 0.08, n_stations),
+        '緯度': centers[:, 0] + rng.normal(0, 0.06, n_stations),
+        '區域屬性': rng.choice(AREA_TYPES, n_stations),
+        '站點屬性': location,
+        '縣市': city,
+        '標案性質': rng.choice(PROJECT_TYPES, n_stations)
+    })
+
+def generate_usage(stations, n_quarters, first_year=2020, seed=0):
+    """產生每季每站每種槍型一列的使用資料；只涵蓋已啟用站點，並混入少量無站點 ID 的列"""
+    rng = np.random.default_rng(seed + 1)
+    quarters = [f"{first_year + q // 4}-Q{q % 4 + 1}" for q in range(n_quarters)]
+    quarter_end = pd.PeriodIndex(quarters, freq='Q').end_time.normalize()
+    install_date = pd.to_datetime(stations['啟用日期'], format='%Y/%m/%d')
+
+    frames = []
+    for charger_type, count_col in [('AC', 'AC槍數量'), ('DC', 'DC槍數量')]:
+        has_guns = (stations[count_col] > 0).to_numpy()
+        ids = stations['站ID'].to_numpy()[has_guns]
+        names = stations['名稱'].to_numpy()[has_guns]
+        installed = install_date.to_numpy()[has_guns]
+
+        # 只保留季度結束前已啟用的 (季度, 站點) 組合
+        active = installed[None, :] <= quarter_end.to_numpy()[:, None]
+        quarter_pos, station_pos = np.nonzero(active)
+        scale = 4.0 if charger_type == 'AC' else 40.0
+        frames.append(pd.DataFrame({
+            'Quarter': np.asarray(quarters, dtype=object)[quarter_pos],
+            'Station': ids[station_pos],
+            'StationName': names[station_pos],
+            'ChargerType': charger_type,
+            'Avg_Degree_Per_Day': np.round(rng.gamma(2.0, scale / 2, len(quarter_pos)), 2)
+        }))
+
+    usage = pd.concat(frames, ignore_index=True)
+    orphan = rng.random(len(usage)) < 0.002
+    usage.loc[orphan, ['Station', 'StationName']] = None
+    return usage.sort_values('Quarter', kind='stable').reset_index(drop=True)
+
+def write_synthetic_dataset(directory, n_stations, n_quarters, ac_share=0.6, dc_share=0.25, seed=0):
+    """將合成資料寫成 <directory>/data/stations.csv 與 usedata.csv，回傳兩個檔案路徑"""
+    data_dir = os.path.join(directory, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    stations = generate_stations(n_stations, ac_share, dc_share, seed=seed)
+    usage = generate_usage(stations, n_quarters, seed=seed)
+
+    station_path = os.path.join(data_dir, 'stations.csv')
+    usage_path = os.path.join(data_dir, 'usedata.csv')
+    # 站點檔與正式資料一樣使用 cp950 編碼，一併測試編碼判斷
+    stations.to_csv(station_path, index=False, encoding='cp950')
+    usage.to_csv(usage_path, index=False, encoding='utf-8')
+    return station_path, usage_path
@@ -0,0 +1,30 @@
+"""充電站分析核心：資料讀取、稼動率計算與站點查詢，不依賴 Streamlit，可直接用於批次作業與效能分析"""
+from .data import (
+    STATION_DATA_PATH, USAGE_DATA_PATH, get_dataset_version, load_station_data, load_usage_data
+)
+from .stations import (
+    build_station_filter_index, build_station_grid_index, build_station_search_index, find_nearby_stations,
+    query_station_filter_index, query_station_grid_index, query_station_search_index
+)
+from .utilization import (
+    apply_capacity, build_quarterly_table, build_station_timeline_store, build_utilization_cube,
+    build_utilization_station_index, calculate_quarterly_utilization, calculate_utilization_rate,
+    compute_utilization_base, lookup_station_timeline, query_utilization_cube, query_utilization_totals,
+    select_utilization_rows, summarize_utilization_rows
+)
+from .sensitivity import CAPACITY_LIMITS, capacity_values, latest_quarter_totals, sweep_capacity_grid
+from .candidates import (
+    CANDIDATE_SORT_OPTIONS, evaluate_candidate_sites, parse_candidate_sites, rank_candidate_sites
+)
+
+__all__ = [
+    'STATION_DATA_PATH', 'USAGE_DATA_PATH', 'get_dataset_version', 'load_station_data', 'load_usage_data',
+    'build_station_filter_index', 'build_station_grid_index', 'build_station_search_index', 'find_nearby_stations',
+    'query_station_filter_index', 'query_station_grid_index', 'query_station_search_index',
+    'apply_capacity', 'build_quarterly_table', 'build_station_timeline_store', 'build_utilization_cube',
+    'build_utilization_station_index', 'calculate_quarterly_utilization', 'calculate_utilization_rate',
+    'compute_utilization_base', 'lookup_station_timeline', 'query_utilization_cube', 'query_utilization_totals',
+    'select_utilization_rows', 'summarize_utilization_rows',
+    'CAPACITY_LIMITS', 'capacity_values', 'latest_quarter_totals', 'sweep_capacity_grid',
+    'CANDIDATE_SORT_OPTIONS', 'evaluate_candidate_sites', 'parse_candidate_sites', 'rank_candidate_sites'
+]
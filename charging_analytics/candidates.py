@@ -0,0 +1,159 @@
+"""批次拓點評估：解析候選點 CSV，一次計算所有候選點的附近站點與最新季度稼動率"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from .data import ENCODING_SNIFF_BYTES, sniff_bytes_encoding
+from .stations import (
+    build_station_filter_index, build_station_grid_index, query_station_filter_index, query_station_grid_index
+)
+
+CANDIDATE_COLUMN_ALIASES = {
+    'latitude': ['latitude', 'lat', '緯度'],
+    'longitude': ['longitude', 'lon', 'lng', '經度'],
+    'name': ['name', '名稱', '候選點', '地點']
+}
+CANDIDATE_SORT_OPTIONS = ['DC稼動率', 'AC稼動率', '附近站點數', 'AC槍數', 'DC槍數']
+
+def read_candidate_csv(raw_bytes):
+    """先以開頭樣本判斷編碼再只解析一次；判斷失準時改以整份內容重新判斷一次，無法解碼時回傳 None"""
+    encoding = sniff_bytes_encoding(raw_bytes[:ENCODING_SNIFF_BYTES], final=len(raw_bytes) <= ENCODING_SNIFF_BYTES)
+    if encoding is None:
+        return None
+    
+    try:
+        return pd.read_csv(io.BytesIO(raw_bytes), encoding=encoding)
+    except UnicodeDecodeError:
+        fallback = sniff_bytes_encoding(raw_bytes)
+        if fallback is None or fallback == encoding:
+            return None
+        return pd.read_csv(io.BytesIO(raw_bytes), encoding=fallback)
+
+def parse_candidate_sites(raw_bytes):
+    """解析上傳的候選點 CSV，回傳含 name/latitude/longitude 欄位的 DataFrame；無法讀取或欄位不足時回傳 None"""
+    try:
+        df = read_candidate_csv(raw_bytes)
+    except (pd.errors.EmptyDataError, pd.errors.ParserError):
+        return None
+    if df is None:
+        return None
+    
+    lowered = {str(col).strip().lower(): col for col in df.columns}
+    columns = {}
+    for target, aliases in CANDIDATE_COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lowered:
+                columns[target] = lowered[alias]
+                break
+    if 'latitude' not in columns or 'longitude' not in columns:
+        return None
+    
+    candidates = pd.DataFrame({
+        'latitude': pd.to_numeric(df[columns['latitude']], errors='coerce'),
+        'longitude': pd.to_numeric(df[columns['longitude']], errors='coerce')
+    })
+    if 'name' in columns:
+        candidates.insert(0, 'name', df[columns['name']].astype(str))
+    else:
+        candidates.insert(0, 'name', [f"候選點 {i + 1}" for i in range(len(df))])
+    return candidates.dropna(subset=['latitude', 'longitude']).reset_index(drop=True)
+
+def build_latest_quarter_table(stations_df, utilization_base):
+    """以站點代碼彙總稼動率明細：每站最新季度代碼，以及每個 (站點, 季度) 的 AC/DC 每槍每日度數總和與筆數"""
+    station_codes, station_keys = pd.factorize(stations_df['station_id'])
+    row_codes = pd.Index(station_keys).get_indexer(utilization_base['Station'])
+    quarter_codes, quarters = pd.factorize(utilization_base['Quarter'], sort=True)
+    n_quarters = max(len(quarters), 1)
+    
+    valid = (row_codes >= 0) & (quarter_codes >= 0)
+    station_latest = np.full(len(station_keys), -1, dtype=np.int64)
+    np.maximum.at(station_latest, row_codes[valid], quarter_codes[valid])
+    
+    # 稼動率平均只計入有值的列，與單點評估 dropna 後取平均一致
+    kwh = utilization_base['kwh_per_gun_day'].to_numpy(dtype=float)
+    is_ac = (utilization_base['ChargerType'] == 'AC').to_numpy()
+    is_dc = (utilization_base['ChargerType'] == 'DC').to_numpy()
+    has_value = valid & ~np.isnan(kwh)
+    keys, inverse = np.unique(row_codes[has_value] * n_quarters + quarter_codes[has_value], return_inverse=True)
+    values = kwh[has_value]
+    
+    return {
+        'station_codes': station_codes,
+        'station_latest': station_latest,
+        'quarters': np.asarray(quarters, dtype=object),
+        'n_quarters': n_quarters,
+        'keys': keys,
+        'ac_sum': np.bincount(inverse, weights=np.where(is_ac[has_value], values, 0), minlength=len(keys)),
+        'ac_count': np.bincount(inverse, weights=is_ac[has_value].astype(float), minlength=len(keys)),
+        'dc_sum': np.bincount(inverse, weights=np.where(is_dc[has_value], values, 0), minlength=len(keys)),
+        'dc_count': np.bincount(inverse, weights=is_dc[has_value].astype(float), minlength=len(keys))
+    }
+
+def evaluate_candidate_sites(candidates, stations_df, utilization_base, radius_km, ac_capacity, dc_capacity,
+                             filters=None, station_index=None, filter_index=None):
+    """批次評估多個候選點：附近站點數、AC/DC 槍數與最新季度 AC/DC 稼動率，數值與單點評估相同"""
+    n = len(candidates)
+    if n == 0 or stations_df.empty:
+        return pd.DataFrame()
+    
+    if station_index is None:
+        station_index = build_station_grid_index(stations_df)
+    allowed = None
+    if filters:
+        if filter_index is None:
+            filter_index = build_station_filter_index(stations_df)
+        allowed = np.zeros(len(stations_df), dtype=bool)
+        allowed[query_station_filter_index(filter_index, filters)] = True
+    
+    # 以空間索引逐點取得 (候選點, 站點位置) 配對，其後的彙總全部向量化
+    pair_candidates = []
+    pair_positions = []
+    for i, (lat, lon) in enumerate(zip(candidates['latitude'].to_numpy(), candidates['longitude'].to_numpy())):
+        positions, _ = query_station_grid_index(station_index, lat, lon, radius_km)
+        if allowed is not None:
+            positions = positions[allowed[positions]]
+        pair_candidates.append(np.full(len(positions), i, dtype=np.int64))
+        pair_positions.append(positions)
+    pair_candidates = np.concatenate(pair_candidates)
+    pair_positions = np.concatenate(pair_positions)
+    
+    result = candidates.reset_index(drop=True)
+    result['附近站點數'] = np.bincount(pair_candidates, minlength=n)
+    for col, label in [('ac_count', 'AC槍數'), ('dc_count', 'DC槍數')]:
+        if col in stations_df.columns:
+            counts = stations_df[col].fillna(0).to_numpy(dtype=float)[pair_positions]
+            result[label] = np.bincount(pair_candidates, weights=counts, minlength=n).astype(int)
+    
+    result['最新季度'] = None
+    result['AC稼動率'] = np.nan
+    result['DC稼動率'] = np.nan
+    if not utilization_base.empty and len(pair_positions) > 0:
+        table = build_latest_quarter_table(stations_df, utilization_base)
+        pair_codes = table['station_codes'][pair_positions]
+        latest = np.full(n, -1, dtype=np.int64)
+        np.maximum.at(latest, pair_candidates, table['station_latest'][pair_codes])
+        
+        # 每個候選點取自己的最新季度，再以 (站點, 季度) 鍵查出該季的度數總和
+        pair_keys = pair_codes * table['n_quarters'] + latest[pair_candidates]
+        slots = np.clip(np.searchsorted(table['keys'], pair_keys), 0, max(len(table['keys']) - 1, 0))
+        found = (latest[pair_candidates] >= 0) & (len(table['keys']) > 0)
+        if len(table['keys']):
+            found &= table['keys'][slots] == pair_keys
+        
+        for prefix, capacity in [('ac', ac_capacity), ('dc', dc_capacity)]:
+            sums = np.bincount(pair_candidates[found], weights=table[f'{prefix}_sum'][slots[found]], minlength=n)
+            counts = np.bincount(pair_candidates[found], weights=table[f'{prefix}_count'][slots[found]], minlength=n)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[f'{prefix.upper()}稼動率'] = np.where(counts > 0, sums / counts / capacity, np.nan)
+        
+        has_quarter = latest >= 0
+        result.loc[has_quarter, '最新季度'] = table['quarters'][latest[has_quarter]]
+    
+    return result
+
+def rank_candidate_sites(evaluated, sort_by='DC稼動率', ascending=False):
+    """依指定欄位排序候選點並加上名次，缺值排在最後"""
+    ranked = evaluated.sort_values(sort_by, ascending=ascending, na_position='last', kind='stable')
+    ranked.insert(0, '排名', np.arange(1, len(ranked) + 1))
+    return ranked.reset_index(drop=True)
@@ -0,0 +1,251 @@
+"""資料檔讀取：編碼判斷、欄位整理、dtype 壓縮與 Feather 快取"""
+import codecs
+import logging
+import os
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 資料檔路徑（相對於執行目錄）與 Feather 快取設定
+STATION_DATA_PATH = 'data/stations.csv'
+USAGE_DATA_PATH = 'data/usedata.csv'
+COMPILED_CACHE_DIR = 'data/.cache'
+UTILIZATION_STORE_PATH = os.path.join(COMPILED_CACHE_DIR, 'utilization.feather')
+COMPILED_CACHE_FORMAT = '2'
+STATION_CATEGORY_COLUMNS = ['area_type', 'location_type', 'city', 'project_type', 'connector_type', 'station_type', 'manager']
+USAGE_CATEGORY_COLUMNS = ['Station', 'StationName', 'ChargerType']
+GUN_COUNT_COLUMNS = ['charger_count', 'ac_count', 'dc_count']
+CSV_ENCODINGS = ['utf-8', 'utf-8-sig', 'big5', 'gbk', 'cp950']
+ENCODING_SNIFF_BYTES = 64 * 1024
+
+def get_file_fingerprint(path):
+    """以檔案修改時間與大小作為資料版本，檔案不存在時回傳 None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+def get_dataset_version():
+    """回傳 (站點資料版本, 使用資料版本)，CSV 更新後快取鍵隨之改變"""
+    return get_file_fingerprint(STATION_DATA_PATH), get_file_fingerprint(USAGE_DATA_PATH)
+
+def get_compiled_cache_path(source_path):
+    """來源 CSV 對應的 Feather 快取路徑"""
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(COMPILED_CACHE_DIR, f"{name}.feather")
+
+def read_feather_file(path):
+    """以 memory map 讀取 Feather 檔，回傳 (DataFrame, metadata)，讀取失敗時回傳 (None, {})"""
+    try:
+        import pyarrow.feather as feather
+        table = feather.read_table(path, memory_map=True)
+    except Exception:
+        return None, {}
+    return table.to_pandas(), dict(table.schema.metadata or {})
+
+def read_feather_metadata(path):
+    """只讀取 Feather 檔的 schema metadata，不載入資料；讀取失敗時回傳 {}"""
+    try:
+        import pyarrow as pa
+        with pa.memory_map(path) as source:
+            return dict(pa.ipc.open_file(source).schema.metadata or {})
+    except Exception:
+        return {}
+
+def write_feather_file(df, path, extra_metadata):
+    """先寫入暫存檔再置換，寫成未壓縮 Feather 檔；寫入失敗時略過不影響主流程"""
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        
+        table = pa.Table.from_pandas(df)
+        metadata = dict(table.schema.metadata or {})
+        metadata.update(extra_metadata)
+        table = table.replace_schema_metadata(metadata)
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+    except Exception:
+        pass
+
+def read_compiled_cache(source_path):
+    """讀取已整理好的 Feather 快取，不存在或來源 CSV 已變更時回傳 None"""
+    source_version = get_file_fingerprint(source_path)
+    if source_version is None:
+        return None
+    
+    df, metadata = read_feather_file(get_compiled_cache_path(source_path))
+    if (df is None
+            or metadata.get(b'source_version') != source_version.encode()
+            or metadata.get(b'format') != COMPILED_CACHE_FORMAT.encode()):
+        return None
+    return df
+
+def write_compiled_cache(df, source_path):
+    """將整理後的資料寫成 Feather 快取，並記錄來源 CSV 版本"""
+    source_version = get_file_fingerprint(source_path)
+    if source_version is None or df.empty:
+        return
+    write_feather_file(df, get_compiled_cache_path(source_path), {
+        b'source_version': source_version.encode(),
+        b'format': COMPILED_CACHE_FORMAT.encode()
+    })
+
+def compact_station_frame(df):
+    """類別欄位轉為 categorical、槍數轉為小整數，降低每份快取與 session 持有的記憶體"""
+    for col in STATION_CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in GUN_COUNT_COLUMNS:
+        if col in df.columns and (df[col] % 1 == 0).all():
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+def compact_usage_frame(df):
+    """季度轉為有序 categorical（可直接取 max），站點與槍型欄位轉為 categorical"""
+    if 'Quarter' in df.columns:
+        quarters = sorted(df['Quarter'].dropna().unique())
+        df['Quarter'] = pd.Categorical(df['Quarter'], categories=quarters, ordered=True)
+    for col in USAGE_CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+def column_memory(df):
+    """各欄 dtype 與 memory_usage(deep=True) 的位元組數，不含索引"""
+    return pd.DataFrame({'dtype': df.dtypes.astype(str), 'bytes': df.memory_usage(deep=True, index=False)})
+
+def compact_with_memory_report(df, compact):
+    """以 compact 壓縮 df，回傳 (壓縮後的 DataFrame, 每欄壓縮前後 dtype 與位元組數的報表，最後一列為總計)"""
+    before = column_memory(df)
+    df = compact(df)
+    report = before.join(column_memory(df), lsuffix='_before', rsuffix='_after')
+    report['bytes_saved'] = report['bytes_before'] - report['bytes_after']
+    report.loc['(total)'] = ['', report['bytes_before'].sum(), '', report['bytes_after'].sum(), report['bytes_saved'].sum()]
+    return df, report
+
+def sniff_bytes_encoding(sample, final=True):
+    """依 CSV_ENCODINGS 順序判斷位元組內容的編碼，回傳第一個能解碼者；final 為 False 表示只是開頭樣本，結尾可能截斷"""
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    
+    if sample.isascii():
+        # 全是 ASCII 時無法區分編碼，固定採用 utf-8
+        return 'utf-8'
+    
+    for encoding in CSV_ENCODINGS:
+        try:
+            # 樣本可能在多位元組字元中間截斷，使用 incremental decoder 不檢查結尾
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=final)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+def sniff_encoding(path, sample_size=ENCODING_SNIFF_BYTES):
+    """只讀取檔案開頭一段位元組判斷編碼，依 CSV_ENCODINGS 順序取第一個能解碼者"""
+    with open(path, 'rb') as f:
+        sample = f.read() if sample_size is None else f.read(sample_size)
+    
+    if sample_size is not None and len(sample) == sample_size and sample.isascii():
+        logger.warning("無法由 %s 開頭 %d bytes 判斷編碼，預設使用 utf-8", path, sample_size)
+    return sniff_bytes_encoding(sample, final=sample_size is None)
+
+def read_csv_auto_encoding(path):
+    """先判斷編碼再只解析一次 CSV；判斷失準時改以整個檔案重新判斷一次"""
+    encoding = sniff_encoding(path)
+    if encoding is None:
+        raise UnicodeDecodeError('sniff', b'', 0, 1, f"{path} 不符合任何支援的編碼")
+    
+    try:
+        return pd.read_csv(path, encoding=encoding)
+    except UnicodeDecodeError:
+        fallback = sniff_encoding(path, sample_size=None)
+        if fallback is None or fallback == encoding:
+            raise
+        logger.warning("%s 以 %s 解碼失敗，改用 %s", path, encoding, fallback)
+        return pd.read_csv(path, encoding=fallback)
+
+def normalize_station_frame(df):
+    """站點 CSV 欄位改為英文名稱並整理座標與槍數；缺少必要欄位時回傳 None"""
+    column_mapping = {
+        '站ID': 'station_id', '名稱': 'name', '經度': 'longitude', '緯度': 'latitude',
+        '充電槍數': 'charger_count', '啟用日期': 'installation_date', '負責人': 'manager',
+        '站點規格': 'station_type', 'AC槍數量': 'ac_count', 'DC槍數量': 'dc_count',
+        '槍頭規格': 'connector_type', '區域屬性': 'area_type', '站點屬性': 'location_type',
+        '縣市': 'city', '標案性質': 'project_type'
+    }
+    
+    df = df.rename(columns=column_mapping)
+    required_columns = ['station_id', 'name', 'latitude', 'longitude', 'charger_count']
+    if not all(col in df.columns for col in required_columns):
+        return None
+    
+    if 'address' not in df.columns:
+        if 'area_type' in df.columns and 'location_type' in df.columns:
+            df['address'] = df['area_type'].fillna('').astype(str) + ' - ' + df['location_type'].fillna('').astype(str)
+        else:
+            df['address'] = df['name']
+    
+    df = df.dropna(subset=['latitude', 'longitude'])
+    df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
+    df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
+    df = df.dropna(subset=['latitude', 'longitude'])
+    
+    for col in ['charger_count', 'ac_count', 'dc_count']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df
+
+def load_station_data(path=STATION_DATA_PATH):
+    """讀取並整理站點資料；讀取失敗時記錄錯誤並回傳空表"""
+    cached = read_compiled_cache(path)
+    if cached is not None:
+        return cached
+    
+    try:
+        try:
+            df = read_csv_auto_encoding(path)
+        except (FileNotFoundError, UnicodeDecodeError):
+            logger.error("找不到充電站資料檔案: %s", path)
+            return pd.DataFrame()
+        
+        df = normalize_station_frame(df)
+        if df is None:
+            return pd.DataFrame()
+        
+        df, report = compact_with_memory_report(df, compact_station_frame)
+        logger.info("站點資料每欄記憶體（壓縮前後）：\n%s", report.to_string())
+        write_compiled_cache(df, path)
+        return df
+    except Exception:
+        logger.exception("讀取站點資料時發生錯誤: %s", path)
+        return pd.DataFrame()
+
+def normalize_usage_frame(df):
+    """使用資料的每日度數轉為數值"""
+    df['Avg_Degree_Per_Day'] = pd.to_numeric(df['Avg_Degree_Per_Day'], errors='coerce')
+    return df
+
+def load_usage_data(path=USAGE_DATA_PATH):
+    """讀取使用資料；讀取失敗時回傳空表"""
+    cached = read_compiled_cache(path)
+    if cached is not None:
+        return cached
+    
+    try:
+        try:
+            df = read_csv_auto_encoding(path)
+        except (FileNotFoundError, UnicodeDecodeError):
+            return pd.DataFrame()
+        df = normalize_usage_frame(df)
+        df, report = compact_with_memory_report(df, compact_usage_frame)
+        logger.info("使用資料每欄記憶體（壓縮前後）：\n%s", report.to_string())
+        write_compiled_cache(df, path)
+        return df
+    except:
+        return pd.DataFrame()
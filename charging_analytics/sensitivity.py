@@ -0,0 +1,49 @@
+"""充電度數敏感度分析：一次計算多組 AC/DC 每次最大電量下的最新季度稼動率"""
+import numpy as np
+
+CAPACITY_LIMITS = (1, 99)
+
+def latest_quarter_totals(totals):
+    """由每季每種槍型的總和與筆數取出最新季度，回傳 (季度, {槍型: (每槍每日度數總和, 筆數)})"""
+    if totals.empty:
+        return None, {}
+    
+    totals = totals[totals['count'] > 0]
+    if totals.empty:
+        return None, {}
+    
+    latest_quarter = totals['Quarter'].max()
+    latest = totals[totals['Quarter'] == latest_quarter]
+    by_type = latest.groupby('ChargerType', observed=True)[['sum', 'count']].sum()
+    return str(latest_quarter), {
+        str(charger_type): (float(row['sum']), int(row['count']))
+        for charger_type, row in by_type.iterrows()
+        if row['count'] > 0
+    }
+
+def sweep_capacity_grid(totals, ac_values, dc_values):
+    """以廣播一次算出多組 AC、DC 每次最大電量下的最新季度 AC 稼動率與 DC 稼動率（與季度表的 AC/DC 欄相同定義）"""
+    # 稼動率為每槍每日度數除以容量，同槍型的平均值等於總和 / (筆數 × 容量)，
+    # 容量向量直接對最新季度的總和廣播，不必對每組參數重新掃描明細
+    quarter, by_type = latest_quarter_totals(totals)
+    ac_values = np.asarray(ac_values, dtype=float)
+    dc_values = np.asarray(dc_values, dtype=float)
+    ac_sum, ac_count = by_type.get('AC', (0.0, 0))
+    dc_sum, dc_count = by_type.get('DC', (0.0, 0))
+    
+    return {
+        'quarter': quarter,
+        'ac_values': ac_values,
+        'dc_values': dc_values,
+        'ac_rate': ac_sum / ac_count / ac_values if ac_count else np.full(len(ac_values), np.nan),
+        'dc_rate': dc_sum / dc_count / dc_values if dc_count else np.full(len(dc_values), np.nan)
+    }
+
+def capacity_values(start, stop, step=1):
+    """產生介於 CAPACITY_LIMITS 內的容量值（含頭尾）"""
+    low, high = CAPACITY_LIMITS
+    start, stop = max(low, int(start)), min(high, int(stop))
+    values = np.arange(start, stop + 1, max(1, int(step)))
+    if len(values) and values[-1] != stop:
+        values = np.append(values, stop)
+    return values
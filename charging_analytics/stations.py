@@ -0,0 +1,258 @@
+"""站點查詢：類別篩選索引、站名搜尋索引與空間網格索引"""
+import numpy as np
+import pandas as pd
+
+CATEGORY_FILTER_COLUMNS = ['area_type', 'location_type', 'city', 'project_type']
+
+def build_station_filter_index(stations_df):
+    """將四個類別篩選欄位編碼為 categorical codes，並記錄每個值對應的站點位置"""
+    columns = {}
+    for col in CATEGORY_FILTER_COLUMNS:
+        if col not in stations_df.columns:
+            continue
+        codes, uniques = pd.factorize(stations_df[col])
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        columns[col] = {
+            'codes': codes,
+            'values': {value: code for code, value in enumerate(uniques)},
+            'positions': [order[bounds[code]:bounds[code + 1]] for code in range(len(uniques))]
+        }
+    return {'n': len(stations_df), 'columns': columns}
+
+def query_station_filter_index(index, filters):
+    """回傳符合所有篩選值的站點位置（遞增排序）；值為 '全部' 或欄位不存在時不篩選"""
+    selected = []
+    for col, value in filters.items():
+        if value == '全部' or col not in index['columns']:
+            continue
+        column = index['columns'][col]
+        code = column['values'].get(value)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        selected.append((len(column['positions'][code]), col, code))
+    
+    if not selected:
+        return np.arange(index['n'])
+    
+    # 從筆數最少的值開始，其餘條件只需比對候選位置的 codes
+    selected.sort()
+    _, col, code = selected[0]
+    positions = index['columns'][col]['positions'][code]
+    for _, col, code in selected[1:]:
+        positions = positions[index['columns'][col]['codes'][positions] == code]
+    return positions
+
+STATION_SEARCH_LIMIT = 50
+STATION_SEARCH_VERIFY_SIZE = 4096
+
+def encode_search_grams(codepoints, owners):
+    """將串接的字元碼位（owners 為各字元所屬的字串位置）編碼為單字元與同字串內相鄰雙字元的整數鍵，
+    回傳 (單字元鍵, 單字元所屬位置, 雙字元鍵, 雙字元所屬位置)"""
+    codepoints = codepoints.astype(np.int64)
+    valid = codepoints != 0
+    pairs = valid[:-1] & valid[1:] & (owners[:-1] == owners[1:])
+    unigrams = codepoints[valid] << 21
+    bigrams = (codepoints[:-1][pairs] << 21) | codepoints[1:][pairs]
+    return unigrams, owners[valid], bigrams, owners[:-1][pairs]
+
+def build_station_search_index(stations_df):
+    """以站名的單字元與雙字元（bigram）建立倒排索引，適用於中文站名的子字串搜尋；站點 ID 另以排序陣列支援前綴查詢"""
+    names = stations_df['name'].fillna('').astype(str).str.lower()
+    ids = stations_df['station_id'].fillna('').astype(str).str.lower().to_numpy(dtype=str)
+    name_lengths = names.str.len().to_numpy(dtype=np.int64)
+    names = names.to_numpy(dtype=object)
+    
+    # 串接所有站名一次取得碼位，再依各站名實際長度標記所屬站點；
+    # 記憶體只隨站名總字數成長，不會因單一過長站名把每一列補齊成同寬矩陣
+    codepoints = np.frombuffer(''.join(names).encode('utf-32-le'), dtype=np.uint32)
+    owners = np.repeat(np.arange(len(names), dtype=np.int32), name_lengths)
+    unigrams, unigram_owners, bigrams, bigram_owners = encode_search_grams(codepoints, owners)
+    del codepoints, owners
+    keys = np.concatenate([unigrams, bigrams])
+    del unigrams, bigrams
+    owners = np.concatenate([unigram_owners, bigram_owners])
+    del unigram_owners, bigram_owners
+    
+    # 依 gram 穩定排序後，同一 gram 的站點位置維持遞增；同站重複出現的 gram 只保留一次
+    order = np.argsort(keys, kind='stable')
+    owners = owners[order]
+    del order
+    keys.sort()
+    keep = np.ones(len(keys), dtype=bool)
+    keep[1:] = (keys[1:] != keys[:-1]) | (owners[1:] != owners[:-1])
+    keys = keys[keep]
+    owners = owners[keep]
+    
+    # keys 已排序，直接取每個 gram 的起點，不需 np.unique 再排序一次
+    starts = np.flatnonzero(np.append(True, keys[1:] != keys[:-1]))
+    id_order = np.argsort(ids, kind='stable')
+    return {
+        'names': names,
+        'name_lengths': name_lengths,
+        'gram_keys': keys[starts],
+        'bounds': np.append(starts, len(keys)),
+        'owners': owners,
+        'sorted_ids': ids[id_order],
+        'id_order': id_order
+    }
+
+def lookup_search_gram(index, key):
+    """以二分搜尋取得單一 gram 的站點位置；不存在時回傳 None"""
+    slot = np.searchsorted(index['gram_keys'], key)
+    if slot == len(index['gram_keys']) or index['gram_keys'][slot] != key:
+        return None
+    return index['owners'][index['bounds'][slot]:index['bounds'][slot + 1]]
+
+def query_station_search_index(index, query, limit=STATION_SEARCH_LIMIT):
+    """回傳 (排序後的前 limit 筆站點位置, 符合總數)；ID 前綴相符者優先（完全相符最前），其次為站名較短者"""
+    query = query.strip().lower()
+    if not query:
+        return np.empty(0, dtype=np.int64), 0
+    
+    # 站點 ID 前綴比對；查詢字串長度不可超過陣列寬度，否則 numpy 會複製整個陣列轉型
+    sorted_ids = index['sorted_ids']
+    width = sorted_ids.dtype.itemsize // 4
+    if len(query) > width:
+        lo = hi = 0
+    elif len(query) == width:
+        lo = np.searchsorted(sorted_ids, query, side='left')
+        hi = np.searchsorted(sorted_ids, query, side='right')
+    else:
+        lo = np.searchsorted(sorted_ids, query, side='left')
+        hi = np.searchsorted(sorted_ids, query + '\U0010ffff', side='left')
+    id_matches = index['id_order'][lo:hi]
+    if len(id_matches) > 1:
+        exact = sorted_ids[lo:hi] == query
+        id_matches = np.concatenate([id_matches[exact], np.sort(id_matches[~exact])])
+    
+    # 站名子字串比對：先取最少站點的 gram，其餘 gram 逐一交集，候選夠少時改為直接確認
+    codepoints = np.array([ord(char) for char in query], dtype=np.int64)
+    unigrams, _, bigrams, _ = encode_search_grams(codepoints, np.zeros(len(query), dtype=np.int64))
+    keys = unigrams if len(query) == 1 else bigrams
+    
+    postings = []
+    for key in set(keys.tolist()):
+        positions = lookup_search_gram(index, key)
+        if positions is None:
+            postings = None
+            break
+        postings.append(positions)
+    
+    name_matches = np.empty(0, dtype=np.int64)
+    if postings:
+        postings.sort(key=len)
+        candidates = postings[0]
+        for positions in postings[1:]:
+            if len(candidates) <= STATION_SEARCH_VERIFY_SIZE:
+                break
+            candidates = np.intersect1d(candidates, positions, assume_unique=True)
+        
+        # 超過兩個字元時，各雙字元皆出現不代表為連續子字串，需逐筆確認
+        if len(query) > 2 and len(candidates) > 0:
+            matched = (query in name for name in index['names'][candidates])
+            candidates = candidates[np.fromiter(matched, dtype=bool, count=len(candidates))]
+        name_matches = candidates[np.argsort(index['name_lengths'][candidates], kind='stable')]
+    
+    if len(id_matches):
+        name_matches = name_matches[~np.isin(name_matches, id_matches)]
+    ranked = np.concatenate([id_matches, name_matches]).astype(np.int64)
+    return ranked[:limit], len(ranked)
+
+EARTH_RADIUS_KM = 6371
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """以 haversine 公式計算兩點間距離（公里），輸入為弧度"""
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    c = 2 * np.arcsin(np.sqrt(a))
+    return EARTH_RADIUS_KM * c
+
+def build_station_grid_index(stations_df, cell_deg=0.02):
+    """將站點依經緯度切成固定大小的網格，依網格編號排序以便半徑查詢只掃描候選格"""
+    lat = stations_df['latitude'].to_numpy(dtype=float)
+    lon = stations_df['longitude'].to_numpy(dtype=float)
+    
+    if len(lat) == 0:
+        return None
+    
+    lat_min = lat.min()
+    lon_min = lon.min()
+    rows = np.floor((lat - lat_min) / cell_deg).astype(np.int64)
+    cols = np.floor((lon - lon_min) / cell_deg).astype(np.int64)
+    n_cols = int(cols.max()) + 1
+    
+    keys = rows * n_cols + cols
+    order = np.argsort(keys, kind='stable')
+    
+    return {
+        'cell_deg': cell_deg,
+        'lat_min': lat_min,
+        'lon_min': lon_min,
+        'n_rows': int(rows.max()) + 1,
+        'n_cols': n_cols,
+        'keys': keys[order],
+        'order': order,
+        'lat_rad': np.radians(lat),
+        'lon_rad': np.radians(lon),
+    }
+
+def query_station_grid_index(index, target_lat, target_lon, radius_km):
+    """回傳半徑內站點的位置（依原始順序）與距離，結果與全表 haversine 計算一致"""
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=float))
+    if index is None:
+        return empty
+    
+    cell_deg = index['cell_deg']
+    angular = radius_km / EARTH_RADIUS_KM
+    # 外框多留一點餘裕，避免浮點誤差漏掉剛好落在半徑邊界的站點
+    margin = 1e-6
+    dlat = np.degrees(angular) + margin
+    max_abs_lat = abs(target_lat) + dlat
+    
+    if angular >= np.pi / 2 or max_abs_lat >= 90:
+        candidates = np.arange(len(index['order']))
+    else:
+        dlon = np.degrees(np.arcsin(min(1.0, np.sin(angular) / np.cos(np.radians(max_abs_lat))))) + margin
+        
+        row_lo = max(int(np.floor((target_lat - dlat - index['lat_min']) / cell_deg)), 0)
+        row_hi = min(int(np.floor((target_lat + dlat - index['lat_min']) / cell_deg)), index['n_rows'] - 1)
+        col_lo = max(int(np.floor((target_lon - dlon - index['lon_min']) / cell_deg)), 0)
+        col_hi = min(int(np.floor((target_lon + dlon - index['lon_min']) / cell_deg)), index['n_cols'] - 1)
+        
+        if row_lo > row_hi or col_lo > col_hi:
+            return empty
+        
+        # 同一列網格的編號連續，每列只需一次二分搜尋
+        row_ids = np.arange(row_lo, row_hi + 1, dtype=np.int64)
+        starts = np.searchsorted(index['keys'], row_ids * index['n_cols'] + col_lo, side='left')
+        ends = np.searchsorted(index['keys'], row_ids * index['n_cols'] + col_hi, side='right')
+        candidates = np.sort(np.concatenate([index['order'][s:e] for s, e in zip(starts, ends)]))
+    
+    distances = haversine_km(
+        np.radians(target_lat), np.radians(target_lon),
+        index['lat_rad'][candidates], index['lon_rad'][candidates]
+    )
+    within = distances <= radius_km
+    return candidates[within], distances[within]
+
+def find_nearby_stations(target_lat, target_lon, stations_df, radius_km=5, station_index=None,
+                         filters=None, filter_index=None):
+    """回傳半徑內（並符合類別篩選）的站點，附 distance_km 欄位並依距離排序"""
+    if stations_df.empty:
+        return pd.DataFrame()
+    
+    if station_index is None:
+        station_index = build_station_grid_index(stations_df)
+    
+    positions, distances = query_station_grid_index(station_index, target_lat, target_lon, radius_km)
+    
+    if filters:
+        if filter_index is None:
+            filter_index = build_station_filter_index(stations_df)
+        keep = np.isin(positions, query_station_filter_index(filter_index, filters), assume_unique=True)
+        positions, distances = positions[keep], distances[keep]
+    
+    nearby = stations_df.iloc[positions].assign(distance_km=distances)
+    return nearby.sort_values('distance_km')
@@ -0,0 +1,315 @@
+"""稼動率計算：每槍每日攤提度數、容量換算、結果檔與季度彙總"""
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from .data import (
+    UTILIZATION_STORE_PATH, compact_usage_frame, read_feather_file, read_feather_metadata, write_feather_file
+)
+from .stations import CATEGORY_FILTER_COLUMNS
+
+def build_quarter_calendar(quarters):
+    """針對每個不重複的季度字串計算起訖日與天數，無法解析者標記為 NaT"""
+    records = []
+    for quarter in quarters:
+        try:
+            year = int(quarter.split('-')[0])
+            quarter_num = int(quarter.split('-Q')[1])
+            quarter_start_month = (quarter_num - 1) * 3 + 1
+            quarter_start = pd.Timestamp(year=year, month=quarter_start_month, day=1)
+            
+            if quarter_num == 4:
+                quarter_end = pd.Timestamp(year=year, month=12, day=31)
+            else:
+                next_quarter_start = pd.Timestamp(year=year, month=quarter_start_month + 3, day=1)
+                quarter_end = next_quarter_start - pd.Timedelta(days=1)
+            
+            quarter_days = (quarter_end - quarter_start).days + 1
+        except:
+            quarter_start = pd.NaT
+            quarter_end = pd.NaT
+            quarter_days = 91
+        records.append((quarter, quarter_start, quarter_end, quarter_days))
+    
+    calendar = pd.DataFrame(records, columns=['Quarter', 'quarter_start', 'quarter_end', 'quarter_days'])
+    return calendar.set_index('Quarter')
+
+def compute_utilization_base(stations_df, usage_df, usage_version=None, incremental=False):
+    """計算與容量參數無關的每槍每日攤提度數；incremental 時資料未變動即沿用結果檔，變動時全部重算並寫回"""
+    if usage_df.empty or stations_df.empty:
+        return pd.DataFrame()
+    
+    if incremental:
+        return update_utilization_store(stations_df, usage_df, usage_version)
+    return compute_utilization_rows(stations_df, usage_df)
+
+def calculate_utilization_rate(stations_df, usage_df, ac_capacity=7, dc_capacity=30, usage_version=None, incremental=False):
+    """計算每槍每日度數，再依 AC/DC 容量換算稼動率"""
+    utilization_base = compute_utilization_base(stations_df, usage_df, usage_version, incremental)
+    return apply_capacity(utilization_base, ac_capacity, dc_capacity)
+
+def build_utilization_station_index(utilization_base):
+    """記錄每個站點在稼動率明細中的列位置（遞增排序），查詢時只取需要的列"""
+    if utilization_base.empty:
+        return {}
+    
+    codes, stations = pd.factorize(utilization_base['Station'])
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(stations) + 1))
+    return {station: order[bounds[i]:bounds[i + 1]] for i, station in enumerate(stations)}
+
+def build_station_timeline_store(utilization_base):
+    """預先彙總每站每季的 AC/DC 平均每槍每日度數與年成長率，依站點排序後記錄每站的連續列範圍；
+    回傳 {'timeline': 彙總寬表, 'slices': {站點: (起始列, 結束列, 該站槍型)}}"""
+    if utilization_base.empty:
+        return {'timeline': pd.DataFrame(), 'slices': {}}
+    
+    grouped = utilization_base.groupby(
+        ['Station', 'Quarter', 'ChargerType'], observed=True, sort=True
+    )['kwh_per_gun_day'].mean().reset_index()
+    grouped['ChargerType'] = grouped['ChargerType'].astype(str)
+    # 單站表只輸出該站出現過的槍型欄位，先記錄每站有哪些槍型
+    has_type = grouped.groupby(['Station', 'ChargerType'], observed=True).size().unstack(
+        'ChargerType', fill_value=0
+    ).reindex(columns=['AC', 'DC'], fill_value=0) > 0
+    
+    # unstack 只保留實際出現的 (站點, 季度) 組合，與單站樞紐表的列一致
+    timeline = grouped.set_index(['Station', 'Quarter', 'ChargerType'])['kwh_per_gun_day'].unstack(
+        'ChargerType'
+    ).reindex(columns=['AC', 'DC']).reset_index()
+    timeline.columns.name = None
+    timeline['Quarter'] = timeline['Quarter'].astype(str)
+    
+    # 年成長率只與度數比例有關，換算稼動率前後相同，可預先計算
+    keys = [timeline['Station'], timeline['Quarter'].str[:4].rename('Year')]
+    yearly = timeline.groupby(keys, observed=True, sort=True)[['AC', 'DC']].mean()
+    growth = yearly.groupby(level='Station', observed=True).pct_change() * 100
+    growth.columns = ['AC年成長率', 'DC年成長率']
+    timeline = timeline.join(growth, on=keys)
+    
+    # 依站點排序後同一站點的列必定連續
+    codes, stations = pd.factorize(timeline['Station'])
+    bounds = np.searchsorted(codes, np.arange(len(stations) + 1)).tolist()
+    type_flags = has_type.reindex(stations).to_numpy().tolist()
+    slices = {
+        station: (bounds[i], bounds[i + 1], tuple(t for t, flag in zip(['AC', 'DC'], type_flags[i]) if flag))
+        for i, station in enumerate(stations)
+    }
+    return {'timeline': timeline, 'slices': slices}
+
+def lookup_station_timeline(timeline_store, station_id, ac_capacity, dc_capacity):
+    """以站點 ID 直接切出預先彙總的歷季資料並換算稼動率，回傳與 calculate_quarterly_utilization 相同格式的季度表"""
+    bounds = timeline_store['slices'].get(station_id)
+    if bounds is None:
+        return pd.DataFrame()
+    
+    start, stop, charger_types = bounds
+    rows = timeline_store['timeline'].iloc[start:stop]
+    table = pd.DataFrame({'Quarter': rows['Quarter'].to_numpy()})
+    for charger_type, capacity in [('AC', ac_capacity), ('DC', dc_capacity)]:
+        if charger_type in charger_types:
+            table[charger_type] = (rows[charger_type].to_numpy() / capacity).round(2)
+    for charger_type in ['AC', 'DC']:
+        if charger_type in charger_types:
+            table[f'{charger_type}年成長率'] = rows[f'{charger_type}年成長率'].to_numpy()
+    return table
+
+def select_utilization_rows(utilization_base, station_index, station_ids):
+    """依站點列位置取出明細，維持原本列序；只複製被選到的列與計算所需欄位"""
+    parts = [station_index[station_id] for station_id in station_ids if station_id in station_index]
+    if not parts:
+        return pd.DataFrame()
+    
+    positions = np.sort(np.concatenate(parts))
+    return utilization_base[['Station', 'Quarter', 'ChargerType', 'kwh_per_gun_day']].take(positions)
+
+def apply_capacity(utilization_base, ac_capacity, dc_capacity):
+    """以 AC/DC 每次最大電量換算稼動率，僅需一次向量除法"""
+    if utilization_base.empty:
+        return pd.DataFrame()
+    
+    is_ac = (utilization_base['ChargerType'] == 'AC').to_numpy()
+    capacity = np.where(is_ac, ac_capacity, dc_capacity)
+    return utilization_base.assign(utilization_rate=utilization_base['kwh_per_gun_day'].to_numpy() / capacity)
+
+def compute_utilization_rows(stations_df, usage_df):
+    """合併站點槍數與啟用日期，逐列計算每槍每日攤提度數（kwh_per_gun_day）"""
+    # 啟用日期在站點表上解析一次，避免對每筆使用資料重複解析
+    station_cols = stations_df[['station_id', 'ac_count', 'dc_count', 'installation_date']].assign(
+        installation_date=lambda df: pd.to_datetime(
+            df['installation_date'], format='mixed', dayfirst=False, errors='coerce'
+        )
+    )
+    merged = usage_df.merge(station_cols, left_on='Station', right_on='station_id', how='left')
+    
+    # 每個季度只解析一次，再以向量方式對應回所有列
+    codes, quarters = pd.factorize(merged['Quarter'], use_na_sentinel=False)
+    calendar = build_quarter_calendar(quarters)
+    quarter_start = calendar['quarter_start'].take(codes).set_axis(merged.index)
+    quarter_end = calendar['quarter_end'].take(codes).set_axis(merged.index)
+    quarter_days = calendar['quarter_days'].take(codes).set_axis(merged.index).astype(float)
+    
+    # 啟用日期落在季度內時，只以實際營運天數攤提
+    actual_days = quarter_days.copy()
+    install_date = merged['installation_date']
+    in_quarter = install_date.notna() & (quarter_start <= install_date) & (install_date <= quarter_end)
+    actual_days[in_quarter] = (quarter_end[in_quarter] - install_date[in_quarter]).dt.days + 1
+    
+    adjusted_avg = (merged['Avg_Degree_Per_Day'] * quarter_days) / actual_days
+    
+    is_ac = (merged['ChargerType'] == 'AC').to_numpy()
+    is_dc = (merged['ChargerType'] == 'DC').to_numpy()
+    gun_count = np.select(
+        [is_ac, is_dc],
+        [merged['ac_count'].to_numpy(dtype=float), merged['dc_count'].to_numpy(dtype=float)],
+        default=np.nan
+    )
+    
+    # 無槍數或非 AC/DC 的列維持 NaN，換算後稼動率亦為 NaN
+    has_guns = gun_count > 0
+    kwh_per_gun_day = np.full(len(merged), np.nan)
+    kwh_per_gun_day[has_guns] = adjusted_avg.to_numpy(dtype=float)[has_guns] / gun_count[has_guns]
+    
+    merged['kwh_per_gun_day'] = kwh_per_gun_day
+    return merged
+
+def hash_frame_rows(df):
+    """逐列計算內容雜湊（uint64 陣列），欄位值相同的列雜湊相同"""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+def update_utilization_store(stations_df, usage_df, usage_version=None, store_path=UTILIZATION_STORE_PATH):
+    """使用資料檔與站點槍數、啟用日期皆未變動時直接沿用結果檔；否則全部重算並寫回結果檔"""
+    station_hash = hashlib.blake2b(
+        hash_frame_rows(stations_df[['station_id', 'ac_count', 'dc_count', 'installation_date']]).tobytes()
+    ).hexdigest()
+    
+    # 先只讀 metadata 比對版本，資料有變動時不必載入舊結果
+    state = json.loads(read_feather_metadata(store_path).get(b'store_state', b'{}'))
+    if (usage_version is not None
+            and state.get('usage_version') == usage_version
+            and state.get('station_hash') == station_hash):
+        stored, _ = read_feather_file(store_path)
+        if stored is not None and 'kwh_per_gun_day' in stored.columns:
+            return stored
+    
+    # 資料有變動時全部重算：向量化計算已比逐季比對、合併與重新排序舊結果更快
+    result = compact_usage_frame(compute_utilization_rows(stations_df, usage_df))
+    if usage_version is not None:
+        write_feather_file(result, store_path, {b'store_state': json.dumps({
+            'station_hash': station_hash,
+            'usage_version': usage_version
+        }).encode()})
+    return result
+
+def calculate_quarterly_utilization(utilization_base, station_index, station_ids, ac_capacity, dc_capacity):
+    """計算指定站點的季度稼動率寬表；station_index 為 build_utilization_station_index 的結果"""
+    if utilization_base.empty or not station_ids:
+        return pd.DataFrame()
+    
+    filtered = apply_capacity(
+        select_utilization_rows(utilization_base, station_index, station_ids),
+        ac_capacity, dc_capacity
+    )
+    if filtered.empty:
+        return pd.DataFrame()
+    
+    quarterly = filtered.groupby(['Quarter', 'ChargerType'], observed=True)['utilization_rate'].mean().reset_index()
+    return build_quarterly_table(quarterly)
+
+def build_quarterly_table(quarterly):
+    """將 (季度, 槍型) 平均稼動率轉為季度寬表，並附上 AC/DC 年成長率"""
+    quarterly = quarterly.sort_values('Quarter')
+    pivot_table = quarterly.pivot(index='Quarter', columns='ChargerType', values='utilization_rate').reset_index()
+    pivot_table.columns.name = None
+    # 輸出表供顯示與下載使用，季度還原為一般字串
+    pivot_table['Quarter'] = pivot_table['Quarter'].astype(str)
+    
+    pivot_table['Year'] = pivot_table['Quarter'].str[:4]
+    
+    agg_dict = {}
+    if 'AC' in pivot_table.columns:
+        agg_dict['AC'] = 'mean'
+    if 'DC' in pivot_table.columns:
+        agg_dict['DC'] = 'mean'
+    
+    if agg_dict:
+        yearly_avg = pivot_table.groupby('Year').agg(agg_dict).reset_index()
+        
+        if 'AC' in yearly_avg.columns:
+            yearly_avg['AC年成長率'] = yearly_avg['AC'].pct_change() * 100
+        if 'DC' in yearly_avg.columns:
+            yearly_avg['DC年成長率'] = yearly_avg['DC'].pct_change() * 100
+        
+        merge_cols = ['Year']
+        if 'AC年成長率' in yearly_avg.columns:
+            merge_cols.append('AC年成長率')
+        if 'DC年成長率' in yearly_avg.columns:
+            merge_cols.append('DC年成長率')
+        
+        pivot_table = pivot_table.merge(
+            yearly_avg[merge_cols],
+            on='Year',
+            how='left'
+        )
+    
+    pivot_table = pivot_table.drop('Year', axis=1)
+    
+    if 'AC' in pivot_table.columns:
+        pivot_table['AC'] = pivot_table['AC'].round(2)
+    
+    if 'DC' in pivot_table.columns:
+        pivot_table['DC'] = pivot_table['DC'].round(2)
+    
+    return pivot_table
+
+def build_utilization_cube(stations_df, utilization_df):
+    """依站點類別屬性、季度與槍型預先彙總每槍每日度數的總和與筆數，與容量參數無關"""
+    if utilization_df.empty or stations_df.empty:
+        return pd.DataFrame()
+    
+    dims = [col for col in CATEGORY_FILTER_COLUMNS if col in stations_df.columns]
+    station_attrs = stations_df[['station_id'] + dims].drop_duplicates('station_id')
+    rows = utilization_df[['Station', 'Quarter', 'ChargerType', 'kwh_per_gun_day']].merge(
+        station_attrs, left_on='Station', right_on='station_id', how='inner'
+    )
+    
+    cube = rows.groupby(dims + ['Quarter', 'ChargerType'], dropna=False, observed=True)['kwh_per_gun_day'].agg(
+        ['sum', 'count']
+    ).reset_index()
+    return cube
+
+def query_utilization_totals(cube, filters):
+    """以篩選條件（'全部' 表示不篩選）加總 cube 格子，回傳每季每種槍型的每槍每日度數總和（sum）與筆數（count）"""
+    if cube.empty:
+        return pd.DataFrame()
+    
+    mask = np.ones(len(cube), dtype=bool)
+    for col, value in filters.items():
+        if value != '全部' and col in cube.columns:
+            mask &= (cube[col] == value).to_numpy()
+    
+    cells = cube[mask]
+    if cells.empty:
+        return pd.DataFrame()
+    
+    return cells.groupby(['Quarter', 'ChargerType'], observed=True)[['sum', 'count']].sum().reset_index()
+
+def summarize_utilization_rows(rows):
+    """將稼動率明細彙總為與 query_utilization_totals 相同格式的每季每種槍型總和與筆數"""
+    if rows.empty:
+        return pd.DataFrame()
+    
+    return rows.groupby(['Quarter', 'ChargerType'], observed=True)['kwh_per_gun_day'].agg(
+        ['sum', 'count']
+    ).reset_index()
+
+def query_utilization_cube(cube, filters, ac_capacity, dc_capacity):
+    """以篩選條件加總 cube 格子並換算稼動率，回傳與 calculate_quarterly_utilization 相同格式的季度表"""
+    totals = query_utilization_totals(cube, filters)
+    if totals.empty:
+        return pd.DataFrame()
+    
+    totals['kwh_per_gun_day'] = totals['sum'].where(totals['count'] > 0) / totals['count']
+    return build_quarterly_table(apply_capacity(totals, ac_capacity, dc_capacity))